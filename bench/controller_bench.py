@@ -0,0 +1,219 @@
+"""Headless benchmark of AddonController's hot path.
+
+Runs the controller against a simulated collection and a recording overlay,
+replaying study sessions with undos, new cards arriving and deck switches,
+and reports per-hook latency, scheduler/database calls and overlay traffic
+as JSON. Run from the repository root:
+
+    python -m bench.controller_bench --reviews 1000 10000 --output results.json
+    python -m bench.controller_bench --baseline results.json
+"""
+
+import argparse
+import importlib
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+import types
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any
+
+from . import fakes
+
+_THINK_MS = 6_000
+_AGAIN_RATE = 0.15
+_UNDO_RATE = 0.01
+_NEW_CARDS_EVERY = 500
+_NEW_CARDS_BATCH = 20
+_DECK_SWITCH_EVERY = 2_000
+_CARDS_PER_LEAF = 2_000
+
+# Counts that must not grow between runs, and how much slower p95 may get.
+_EXACT_METRICS = ("scheduler_calls", "overlay_reloads")
+_LATENCY_TOLERANCE = 1.5
+
+
+def _load_default_config() -> dict[str, Any]:
+    return json.loads((fakes.SRC_DIR / "config.json").read_text())
+
+
+def _summarize(samples_ns: list[int]) -> dict[str, float]:
+    if not samples_ns:
+        return {"count": 0}
+    ordered = sorted(samples_ns)
+
+    def pct(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))] / 1000
+
+    return {
+        "count": len(ordered),
+        "mean_us": round(statistics.fmean(ordered) / 1000, 3),
+        "p50_us": round(pct(0.50), 3),
+        "p95_us": round(pct(0.95), 3),
+        "p99_us": round(pct(0.99), 3),
+        "max_us": round(ordered[-1] / 1000, 3),
+    }
+
+
+class _Session:
+    def __init__(
+        self, controller_module: types.ModuleType, mode: str, reviews: int, seed: int
+    ) -> None:
+        config = _load_default_config()
+        config["update_every_mode"] = mode
+        fakes.mw.addonManager.getConfig = lambda name: dict(config)
+
+        self.calls: Counter = Counter()
+        decks = fakes.build_decks(max(_CARDS_PER_LEAF, reviews))
+        self.col = fakes.SimCollection(decks, self.calls)
+        fakes.mw.col = self.col
+        fakes.mw.state = "review"
+        fakes.FakeOverlayGroup.recorder = fakes._Recorder()
+
+        self.rng = random.Random(seed)
+        self.latency: dict[str, list[int]] = defaultdict(list)
+        self.controller = controller_module.AddonController(fakes.PACKAGE)
+        self.events: Counter = Counter()
+
+    def _timed(self, name: str, hook: Any, *args: Any) -> None:
+        start = time.perf_counter_ns()
+        hook(*args)
+        self.latency[name].append(time.perf_counter_ns() - start)
+
+    def _queues_changed(self, handler: object | None) -> None:
+        changes = types.SimpleNamespace(study_queues=True, deck=False)
+        self._timed(
+            "on_operation_executed", self.controller.on_operation_executed, changes, handler
+        )
+
+    def _add_new_cards(self) -> None:
+        leaves = [deck for deck in self.col.deck_map.values() if deck.remaining or deck.studied]
+        self.rng.choice(leaves).new += _NEW_CARDS_BATCH
+        self.events["new_cards"] += 1
+        self._queues_changed(None)
+
+    def _switch_deck(self) -> None:
+        self.col.current_deck_id = self.rng.choice(list(self.col.deck_map))
+        self.events["deck_switches"] += 1
+        fakes.mw.state = "overview"
+        self._timed("on_state_change", self.controller.on_state_change, "overview", "review")
+        fakes.mw.state = "review"
+        self._timed("on_state_change", self.controller.on_state_change, "review", "overview")
+
+    def run(self, reviews: int) -> None:
+        self.controller.toggle_overlay()
+        fakes.loop.advance(0)
+        for i in range(1, reviews + 1):
+            card = self.col.next_card(self.rng)
+            while card is None:
+                self._add_new_cards()
+                card = self.col.next_card(self.rng)
+
+            self._timed("on_review_shown", self.controller.on_review_shown, card)
+            fakes.loop.advance(_THINK_MS)
+
+            previous_queue = card.queue
+            again = self.rng.random() < _AGAIN_RATE
+            self.col.answer(card, again)
+            self._timed(
+                "on_card_answered", self.controller.on_card_answered, fakes.mw.reviewer, card, 3
+            )
+            self._queues_changed(fakes.mw.reviewer)
+
+            if self.rng.random() < _UNDO_RATE:
+                self.col.undo(card, previous_queue, again)
+                self.events["undos"] += 1
+                self._queues_changed(None)
+                self._timed("on_review_shown", self.controller.on_review_shown, card)
+            if i % _NEW_CARDS_EVERY == 0:
+                self._add_new_cards()
+            if i % _DECK_SWITCH_EVERY == 0:
+                self._switch_deck()
+            fakes.loop.advance(0)
+
+    def report(self, reviews: int, mode: str) -> dict[str, Any]:
+        overlay = fakes.FakeOverlayGroup.recorder.calls
+        js_methods = ("update_progress", "patch_appearance", "start_timer", "stop_timer")
+        return {
+            "reviews": reviews,
+            "update_every_mode": mode,
+            "events": dict(self.events),
+            "hooks": {name: _summarize(samples) for name, samples in self.latency.items()},
+            "scheduler_calls": sum(
+                n for call, n in self.calls.items() if call.startswith(("sched.", "db."))
+            ),
+            "backend_calls": dict(self.calls),
+            "overlay_messages": sum(overlay[m] for m in js_methods),
+            "overlay_reloads": overlay["render"],
+            "overlay_calls": dict(overlay),
+        }
+
+
+def run(reviews: list[int], modes: list[str], seed: int) -> dict[str, Any]:
+    with tempfile.TemporaryDirectory() as user_files:
+        fakes.install(_load_default_config(), Path(user_files))
+        controller_module = importlib.import_module(f"{fakes.PACKAGE}.controller")
+        controller_module.OverlayGroup = fakes.FakeOverlayGroup
+        config_module = importlib.import_module(f"{fakes.PACKAGE}.config")
+        modes = modes or [mode.value for mode in config_module.UpdateMode]
+
+        results = []
+        for count in reviews:
+            for mode in modes:
+                session = _Session(controller_module, mode, count, seed)
+                session.run(count)
+                results.append(session.report(count, mode))
+    return {"benchmark": "controller", "seed": seed, "python": sys.version, "results": results}
+
+
+def _regressions(current: dict[str, Any], baseline: dict[str, Any]) -> list[str]:
+    def key(result: dict[str, Any]) -> tuple[int, str]:
+        return result["reviews"], result["update_every_mode"]
+
+    previous = {key(result): result for result in baseline["results"]}
+    problems = []
+    for result in current["results"]:
+        before = previous.get(key(result))
+        if before is None:
+            continue
+        label = f"{result['reviews']} reviews / {result['update_every_mode']}"
+        for metric in _EXACT_METRICS:
+            if result[metric] > before[metric]:
+                problems.append(f"{label}: {metric} {before[metric]} -> {result[metric]}")
+        for hook, stats in result["hooks"].items():
+            old = before["hooks"].get(hook, {}).get("p95_us")
+            if old and stats.get("p95_us", 0) > old * _LATENCY_TOLERANCE:
+                problems.append(f"{label}: {hook} p95 {old} us -> {stats['p95_us']} us")
+    return problems
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reviews", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--modes", nargs="+", default=[], help="update_every_mode values")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", type=Path, help="write JSON here instead of stdout")
+    parser.add_argument("--baseline", type=Path, help="fail if results regress against this")
+    args = parser.parse_args(argv)
+
+    results = run(args.reviews, args.modes, args.seed)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        problems = _regressions(results, json.loads(args.baseline.read_text()))
+        for problem in problems:
+            print(f"regression: {problem}", file=sys.stderr)
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,410 @@
+import heapq
+import itertools
+import random
+import sys
+import types
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+QUEUE_TYPE_NEW = 0
+QUEUE_TYPE_LRN = 1
+QUEUE_TYPE_REV = 2
+REVLOG_RESCHED = 4
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+PACKAGE = "progress_circle"
+
+
+# Virtual-time event loop standing in for Qt's: timers and background
+# operations run only when the simulation advances the clock.
+class FakeLoop:
+    def __init__(self) -> None:
+        self.now_ms = 0
+        self._queue: list[tuple[int, int, Callable[[], None]]] = []
+        self._seq = itertools.count()
+
+    def call_later(self, delay_ms: int, callback: Callable[[], None]) -> None:
+        heapq.heappush(self._queue, (self.now_ms + max(0, delay_ms), next(self._seq), callback))
+
+    def advance(self, ms: int = 0) -> None:
+        target = self.now_ms + ms
+        while self._queue and self._queue[0][0] <= target:
+            due, _, callback = heapq.heappop(self._queue)
+            self.now_ms = max(self.now_ms, due)
+            callback()
+        self.now_ms = target
+
+
+loop = FakeLoop()
+
+
+class _Signal:
+    def __init__(self) -> None:
+        self._slots: list[Callable[..., Any]] = []
+
+    def connect(self, slot: Callable[..., Any]) -> None:
+        self._slots.append(slot)
+
+    def emit(self, *args: Any) -> None:
+        for slot in list(self._slots):
+            slot(*args)
+
+
+class FakeQTimer:
+    def __init__(self, parent: Any = None) -> None:
+        self.timeout = _Signal()
+        self._single_shot = False
+        self._interval = 0
+        self._generation = 0
+        self._active = False
+
+    def setSingleShot(self, single_shot: bool) -> None:
+        self._single_shot = single_shot
+
+    def setInterval(self, ms: int) -> None:
+        self._interval = ms
+
+    def isActive(self) -> bool:
+        return self._active
+
+    def start(self, ms: int | None = None) -> None:
+        if ms is not None:
+            self._interval = ms
+        self._generation += 1
+        self._active = True
+        self._arm(self._generation)
+
+    def _arm(self, generation: int) -> None:
+        def fire() -> None:
+            if generation != self._generation or not self._active:
+                return
+            if self._single_shot:
+                self._active = False
+            else:
+                self._arm(generation)
+            self.timeout.emit()
+
+        loop.call_later(self._interval, fire)
+
+    def stop(self) -> None:
+        self._generation += 1
+        self._active = False
+
+    def remainingTime(self) -> int:
+        return self._interval if self._active else -1
+
+    @staticmethod
+    def singleShot(ms: int, callback: Callable[[], None]) -> None:
+        loop.call_later(ms, callback)
+
+
+class _Anything:
+    # Stand-in for Qt classes the controller path imports but never uses.
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        pass
+
+    def __getattr__(self, name: str) -> Any:
+        return _Anything()
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        return _Anything()
+
+
+class FakeQueryOp:
+    def __init__(self, *, parent: Any, op: Callable[[Any], Any], success: Callable[[Any], Any]):
+        self._op = op
+        self._success = success
+        self._failure: Callable[[Exception], Any] | None = None
+
+    def failure(self, callback: Callable[[Exception], Any]) -> "FakeQueryOp":
+        self._failure = callback
+        return self
+
+    def run_in_background(self) -> None:
+        def run() -> None:
+            try:
+                result = self._op(mw.col)
+            except Exception as exc:
+                if self._failure is None:
+                    raise
+                self._failure(exc)
+                return
+            self._success(result)
+
+        loop.call_later(0, run)
+
+
+class _HookList(list):
+    def __call__(self, *args: Any) -> None:
+        for hook in list(self):
+            hook(*args)
+
+
+class _GuiHooks:
+    def __getattr__(self, name: str) -> _HookList:
+        hooks = _HookList()
+        setattr(self, name, hooks)
+        return hooks
+
+
+# Simulated collection
+
+
+@dataclass
+class SimDeck:
+    id: int
+    name: str
+    new: int = 0
+    learning: int = 0
+    review: int = 0
+    studied: int = 0
+
+    @property
+    def remaining(self) -> int:
+        return self.new + self.learning + self.review
+
+
+@dataclass
+class SimCard:
+    id: int
+    did: int
+    queue: int
+
+
+@dataclass
+class DueNode:
+    deck_id: int
+    new_count: int
+    learn_count: int
+    review_count: int
+    children: list["DueNode"] = field(default_factory=list)
+
+
+class SimCollection:
+    def __init__(self, decks: list[SimDeck], calls: Counter) -> None:
+        self.calls = calls
+        self.deck_map = {deck.id: deck for deck in decks}
+        self.current_deck_id = decks[0].id
+        self._card_ids = itertools.count(1)
+        self.decks = types.SimpleNamespace(
+            get_current_id=self._get_current_id, all_names_and_ids=self._all_names_and_ids
+        )
+        self.sched = types.SimpleNamespace(
+            today=100,
+            day_cutoff=2**40,
+            deck_due_tree=self._deck_due_tree,
+            get_queued_cards=self._get_queued_cards,
+        )
+        self.db = types.SimpleNamespace(all=self._db_all)
+
+    def _get_current_id(self) -> int:
+        self.calls["decks.get_current_id"] += 1
+        return self.current_deck_id
+
+    def _all_names_and_ids(self, **kwargs: Any) -> list[types.SimpleNamespace]:
+        self.calls["decks.all_names_and_ids"] += 1
+        return [types.SimpleNamespace(id=d.id, name=d.name) for d in self.deck_map.values()]
+
+    def subtree(self, deck_id: int) -> list[SimDeck]:
+        prefix = self.deck_map[deck_id].name
+        return [
+            deck
+            for deck in self.deck_map.values()
+            if deck.name == prefix or deck.name.startswith(prefix + "::")
+        ]
+
+    def _deck_due_tree(self) -> DueNode:
+        self.calls["sched.deck_due_tree"] += 1
+        nodes = {
+            deck.id: DueNode(
+                deck.id,
+                sum(d.new for d in self.subtree(deck.id)),
+                sum(d.learning for d in self.subtree(deck.id)),
+                sum(d.review for d in self.subtree(deck.id)),
+            )
+            for deck in self.deck_map.values()
+        }
+        by_name = {deck.name: deck.id for deck in self.deck_map.values()}
+        root = DueNode(0, 0, 0, 0)
+        for deck in self.deck_map.values():
+            parent, _, _ = deck.name.rpartition("::")
+            (nodes[by_name[parent]] if parent else root).children.append(nodes[deck.id])
+        return root
+
+    def _get_queued_cards(self, fetch_limit: int = 1) -> types.SimpleNamespace:
+        self.calls["sched.get_queued_cards"] += 1
+        decks = self.subtree(self.current_deck_id)
+        return types.SimpleNamespace(
+            new_count=sum(d.new for d in decks),
+            learning_count=sum(d.learning for d in decks),
+            review_count=sum(d.review for d in decks),
+        )
+
+    def _db_all(self, sql: str, *args: Any) -> list[tuple[int, int]]:
+        self.calls["db.all"] += 1
+        return [(deck.id, deck.studied) for deck in self.deck_map.values() if deck.studied]
+
+    def next_card(self, rng: random.Random) -> SimCard | None:
+        decks = [deck for deck in self.subtree(self.current_deck_id) if deck.remaining]
+        if not decks:
+            return None
+        deck = rng.choice(decks)
+        queues = [
+            (QUEUE_TYPE_NEW, deck.new),
+            (QUEUE_TYPE_LRN, deck.learning),
+            (QUEUE_TYPE_REV, deck.review),
+        ]
+        queue = rng.choices([q for q, _ in queues], weights=[n for _, n in queues])[0]
+        return SimCard(next(self._card_ids), deck.id, queue)
+
+    def answer(self, card: SimCard, again: bool) -> None:
+        deck = self.deck_map[card.did]
+        if card.queue == QUEUE_TYPE_NEW:
+            deck.new -= 1
+        elif card.queue == QUEUE_TYPE_LRN:
+            deck.learning -= 1
+        else:
+            deck.review -= 1
+        if again:
+            deck.learning += 1
+            card.queue = QUEUE_TYPE_LRN
+        else:
+            deck.studied += 1
+            card.queue = QUEUE_TYPE_REV
+
+    def undo(self, card: SimCard, previous_queue: int, again: bool) -> None:
+        deck = self.deck_map[card.did]
+        if again:
+            deck.learning -= 1
+        else:
+            deck.studied -= 1
+        if previous_queue == QUEUE_TYPE_NEW:
+            deck.new += 1
+        elif previous_queue == QUEUE_TYPE_LRN:
+            deck.learning += 1
+        else:
+            deck.review += 1
+        card.queue = previous_queue
+
+
+def build_decks(cards_per_leaf: int) -> list[SimDeck]:
+    names = ["Languages", "Languages::French", "Languages::German", "Medicine"]
+    names += [f"Medicine::Block {i}" for i in range(1, 7)]
+    leaves = {"Languages::French", "Languages::German"} | {n for n in names if "Block" in n}
+    decks = []
+    for deck_id, name in enumerate(names, start=1):
+        deck = SimDeck(deck_id, name)
+        if name in leaves:
+            deck.new = cards_per_leaf // 4
+            deck.review = cards_per_leaf - deck.new
+        decks.append(deck)
+    return decks
+
+
+# Module installation
+
+
+class _Recorder:
+    def __init__(self) -> None:
+        self.calls: Counter = Counter()
+
+
+class FakeOverlayGroup:
+    # Records what the controller asks the overlay to do instead of drawing.
+    recorder = _Recorder()
+
+    def __init__(self, *, host: Any = None) -> None:
+        self._visible = False
+        self.resumed = _Signal()
+        self.windows_added = _Signal()
+
+    def isVisible(self) -> bool:
+        return self._visible
+
+    def is_active(self) -> bool:
+        return self._visible
+
+    def show_placed(self, config: Any) -> None:
+        self.show()
+
+    def show(self) -> None:
+        if not self._visible:
+            self._visible = True
+            self.resumed.emit()
+
+    def close(self) -> None:
+        self._visible = False
+
+    def __getattr__(self, name: str) -> Callable[..., None]:
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def record(*args: Any, **kwargs: Any) -> None:
+            self.recorder.calls[name] += 1
+
+        return record
+
+
+mw = types.SimpleNamespace()
+
+
+def install(config: dict[str, Any], user_files: Path) -> None:
+    qt = types.ModuleType("aqt.qt")
+    qt.QTimer = FakeQTimer
+    qt.__getattr__ = lambda name: _Anything
+
+    aqt = types.ModuleType("aqt")
+    aqt.mw = mw
+    aqt.gui_hooks = _GuiHooks()
+    aqt.qt = qt
+    operations = types.ModuleType("aqt.operations")
+    operations.QueryOp = FakeQueryOp
+    reviewer = types.ModuleType("aqt.reviewer")
+    reviewer.Reviewer = object
+    webview = types.ModuleType("aqt.webview")
+    webview.WebContent = object
+
+    anki = types.ModuleType("anki")
+    cards = types.ModuleType("anki.cards")
+    cards.Card = SimCard
+    collection = types.ModuleType("anki.collection")
+    collection.Collection = SimCollection
+    collection.OpChanges = types.SimpleNamespace
+    consts = types.ModuleType("anki.consts")
+    consts.QUEUE_TYPE_LRN = QUEUE_TYPE_LRN
+    consts.REVLOG_RESCHED = REVLOG_RESCHED
+
+    sys.modules.update(
+        {
+            "aqt": aqt,
+            "aqt.qt": qt,
+            "aqt.operations": operations,
+            "aqt.reviewer": reviewer,
+            "aqt.webview": webview,
+            "anki": anki,
+            "anki.cards": cards,
+            "anki.collection": collection,
+            "anki.consts": consts,
+        }
+    )
+
+    mw.col = None
+    mw.state = "review"
+    mw.reviewer = object()
+    mw.pm = types.SimpleNamespace(name="bench")
+    mw.addonManager = types.SimpleNamespace(
+        getConfig=lambda name: dict(config),
+        writeConfig=lambda name, conf: None,
+        addonConfigDefaults=lambda name: dict(config),
+        addonsFolder=lambda name: str(user_files),
+        setConfigAction=lambda name, action: None,
+    )
+
+    # Import the add-on under an alias so src/__init__.py (which registers
+    # the real add-on instance) never runs.
+    package = types.ModuleType(PACKAGE)
+    package.__path__ = [str(SRC_DIR)]
+    sys.modules[PACKAGE] = package
@@ -0,0 +1,294 @@
+"""Frame-time and memory benchmark of ProgressOverlay under offscreen Qt.
+
+Drives each renderer backend without a display and reports, as JSON, the
+time from the first render() until the circle is ready, update_progress
+round-trips, the CPU cost of timer ticks at several intervals, and the
+resident memory of this process and of any renderer helper processes
+(QtWebEngineProcess). Needs PyQt6 (and PyQt6-WebEngine for the web
+backend); Anki itself is optional. Run from the repository root:
+
+    python -m bench.renderer_bench --output renderer.json
+"""
+
+import argparse
+import importlib
+import json
+import os
+import statistics
+import sys
+import time
+import types
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+PACKAGE = "progress_circle"
+
+_SIZE = (1920, 1080)
+_UPDATES = 200
+_TIMER_INTERVALS_MS = (16, 50, 250, 1000)
+_TIMER_RUN_MS = 3_000
+_READY_TIMEOUT_MS = 20_000
+
+
+def _install_qt() -> types.ModuleType:
+    # Use Anki's aqt.qt when available, otherwise assemble the same namespace
+    # from PyQt6 so the add-on modules import unchanged. Either way the add-on
+    # is imported under its package name.
+    package = types.ModuleType(PACKAGE)
+    package.__path__ = [str(SRC_DIR)]
+    sys.modules[PACKAGE] = package
+    try:
+        return importlib.import_module("aqt.qt")
+    except ImportError:
+        pass
+    from PyQt6 import QtCore, QtGui, QtWidgets
+
+    qt = types.ModuleType("aqt.qt")
+    for module in (QtCore, QtGui, QtWidgets):
+        qt.__dict__.update({k: v for k, v in vars(module).items() if not k.startswith("_")})
+    try:
+        from PyQt6 import QtWebEngineCore, QtWebEngineWidgets
+
+        qt.__dict__.update(vars(QtWebEngineCore))
+        qt.__dict__.update(vars(QtWebEngineWidgets))
+    except ImportError:
+        pass
+    aqt = types.ModuleType("aqt")
+    aqt.qt = qt
+    sys.modules.update({"aqt": aqt, "aqt.qt": qt})
+    return qt
+
+
+# /proc based process sampling (Linux); other platforms report nothing.
+
+
+def _children(pid: int) -> list[int]:
+    found = []
+    try:
+        tasks = os.listdir(f"/proc/{pid}/task")
+    except OSError:
+        return found
+    for task in tasks:
+        try:
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                found.extend(int(child) for child in f.read().split())
+        except OSError:
+            continue
+    for child in list(found):
+        found.extend(_children(child))
+    return found
+
+
+def _rss_kb(pid: int) -> int | None:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _cpu_seconds(pid: int) -> float:
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+    except OSError:
+        return 0.0
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def _memory() -> dict[str, Any]:
+    pid = os.getpid()
+    helpers = {child: _rss_kb(child) for child in _children(pid)}
+    return {
+        "process_rss_kb": _rss_kb(pid),
+        "helper_rss_kb": {str(k): v for k, v in helpers.items() if v is not None},
+        "total_rss_kb": (_rss_kb(pid) or 0) + sum(v for v in helpers.values() if v),
+    }
+
+
+def _cpu_total() -> float:
+    pid = os.getpid()
+    return _cpu_seconds(pid) + sum(_cpu_seconds(child) for child in _children(pid))
+
+
+class _Bench:
+    def __init__(self, qt: types.ModuleType) -> None:
+        self.qt = qt
+        self.app = qt.QApplication.instance() or qt.QApplication(sys.argv)
+        config_module = importlib.import_module(f"{PACKAGE}.config")
+        self.overlay_module = importlib.import_module(f"{PACKAGE}.overlay")
+        raw = json.loads((SRC_DIR / "config.json").read_text())
+        self.Config = config_module.Config
+        self.base_config = config_module.Config.from_dict(raw)
+        self.RendererBackend = config_module.RendererBackend
+        self.TimerMode = config_module.TimerMode
+
+    def wait_until(self, predicate: Callable[[], bool], timeout_ms: int) -> bool:
+        self.app.processEvents()
+        if predicate():
+            return True
+        loop = self.qt.QEventLoop()
+        poll = self.qt.QTimer()
+        poll.timeout.connect(lambda: predicate() and loop.quit())
+        poll.start(1)
+        self.qt.QTimer.singleShot(timeout_ms, loop.quit)
+        loop.exec()
+        poll.stop()
+        return predicate()
+
+    def spin(self, ms: int) -> None:
+        # Runs the event loop without busy-waiting so CPU samples only count
+        # the renderer's own work.
+        loop = self.qt.QEventLoop()
+        self.qt.QTimer.singleShot(ms, loop.quit)
+        loop.exec()
+
+    def _round_trip(self, overlay: Any) -> Callable[[], bool]:
+        # Returns a predicate that turns true once the renderer has applied
+        # everything sent so far.
+        renderer = overlay._renderer
+        if renderer.backend == self.RendererBackend.NATIVE:
+            renderer.widget.repaint()
+            return lambda: True
+        done = []
+        # Queued behind the bridge's own flush, so the page runs it afterwards.
+        self.qt.QTimer.singleShot(
+            0,
+            lambda: renderer.widget.page().runJavaScript(
+                "new Promise(function (r) { requestAnimationFrame(r); }); 1",
+                lambda result: done.append(True),
+            ),
+        )
+        return lambda: bool(done)
+
+    def _first_render(self, overlay: Any, config: Any) -> float | None:
+        start = time.perf_counter()
+        overlay.render(config, 42.0)
+        renderer = overlay._renderer
+        if renderer.backend == self.RendererBackend.WEB:
+            loaded = []
+            renderer.widget.page().loadFinished.connect(lambda ok: loaded.append(ok))
+            if not self.wait_until(lambda: bool(loaded), _READY_TIMEOUT_MS):
+                return None
+        ready = self._round_trip(overlay)
+        if not self.wait_until(ready, _READY_TIMEOUT_MS):
+            return None
+        return (time.perf_counter() - start) * 1000
+
+    def _updates(self, overlay: Any, config: Any) -> dict[str, float]:
+        samples = []
+        for i in range(_UPDATES):
+            start = time.perf_counter()
+            overlay.update_progress(config, (i % 100) + 0.5)
+            ready = self._round_trip(overlay)
+            if not self.wait_until(ready, _READY_TIMEOUT_MS):
+                break
+            samples.append((time.perf_counter() - start) * 1000)
+        if not samples:
+            return {"count": 0}
+        ordered = sorted(samples)
+        return {
+            "count": len(ordered),
+            "mean_ms": round(statistics.fmean(ordered), 3),
+            "p50_ms": round(ordered[len(ordered) // 2], 3),
+            "p95_ms": round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))], 3),
+            "max_ms": round(ordered[-1], 3),
+        }
+
+    def _timer(self, overlay: Any, config: Any) -> dict[str, Any]:
+        results: dict[str, Any] = {}
+        runs = [(self.TimerMode.ANIMATED, None)]
+        runs += [(self.TimerMode.INTERVAL, interval) for interval in _TIMER_INTERVALS_MS]
+        for mode, interval in runs:
+            timer_config = self.Config.from_dict(
+                {
+                    **config.to_dict(),
+                    "timer_mode": mode,
+                    "timer_interval_ms": interval or config.timer_interval_ms,
+                }
+            )
+            cpu_before = _cpu_total()
+            overlay.start_timer(timer_config, 60)
+            self.spin(_TIMER_RUN_MS)
+            overlay.stop_timer()
+            cpu_ms = (_cpu_total() - cpu_before) * 1000
+            label = "animated" if interval is None else f"interval_{interval}ms"
+            results[label] = {"cpu_ms_per_s": round(cpu_ms / (_TIMER_RUN_MS / 1000), 2)}
+        return results
+
+    def run_backend(self, backend: str, geometry: str) -> dict[str, Any]:
+        config = self.Config.from_dict(
+            {
+                **self.base_config.to_dict(),
+                "renderer_backend": backend,
+                "overlay_geometry": geometry,
+            }
+        )
+        memory_before = _memory()
+        try:
+            overlay = self.overlay_module.ProgressOverlay(None)
+            if geometry == "fullscreen":
+                overlay.resize(*_SIZE)
+                overlay.show()
+            else:
+                overlay.show_placed(config, self.app.primaryScreen())
+            first_render_ms = self._first_render(overlay, config)
+        except Exception as exc:  # noqa: BLE001 - e.g. QtWebEngine not installed
+            return {"backend": backend, "error": f"{type(exc).__name__}: {exc}"}
+        if first_render_ms is None:
+            overlay.close()
+            return {"backend": backend, "error": "renderer never became ready"}
+        result = {
+            "backend": backend,
+            "size": [overlay.width(), overlay.height()],
+            "first_render_ms": round(first_render_ms, 3),
+            "update_progress": self._updates(overlay, config),
+            "timer": self._timer(overlay, config),
+            "memory_before": memory_before,
+            "memory_after": _memory(),
+        }
+        overlay.close()
+        overlay.deleteLater()
+        self.spin(100)
+        return result
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backends", nargs="+", default=["native", "web"])
+    parser.add_argument(
+        "--geometry",
+        choices=["fullscreen", "compact"],
+        default="fullscreen",
+        help="overlay window placement (compact uses the size and anchor in config.json)",
+    )
+    parser.add_argument("--output", type=Path, help="write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    qt = _install_qt()
+    qt.QCoreApplication.setAttribute(qt.Qt.ApplicationAttribute.AA_ShareOpenGLContexts)
+    bench = _Bench(qt)
+    # Each backend runs in a fresh overlay; memory is sampled around each.
+    results = {
+        "benchmark": "renderer",
+        "platform": os.environ["QT_QPA_PLATFORM"],
+        "geometry": args.geometry,
+        "results": [bench.run_backend(backend, args.geometry) for backend in args.backends],
+    }
+    text = json.dumps(results, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
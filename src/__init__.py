@@ -16,7 +16,11 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from .controller import AddonController
+from .startup import startup_timings
 
-_addon = AddonController(__name__)
-_addon.register_hooks()
+with startup_timings.measure("import"):
+    from .controller import AddonController
+
+with startup_timings.measure("load"):
+    _addon = AddonController(__name__)
+    _addon.register_hooks()
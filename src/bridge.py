@@ -0,0 +1,109 @@
+import enum
+import json
+import time
+from collections.abc import Callable
+from typing import Any, Protocol
+
+from aqt.qt import QTimer
+
+from .diagnostics import diagnostics
+from .tracing import tracer
+
+# How often, and for how long, traced updates are polled for the page's
+# after-frame acknowledgement.
+_ACK_POLL_MS = 4
+_ACK_POLL_LIMIT = 250
+
+
+class Channel(enum.StrEnum):
+    APPEARANCE = "appearance"
+    PROGRESS = "progress"
+    TIMER = "timer"
+    LIFECYCLE = "lifecycle"
+    CAPTION = "caption"
+
+
+# QWebEnginePage.runJavaScript, or anything with the same shape.
+class RunJs(Protocol):
+    def __call__(self, script: str, callback: Callable[[Any], None] = ..., /) -> None: ...
+
+
+# Collects overlay updates and sends them to the page as one applyState() call
+# per event-loop turn. Only the latest value of each key survives, so bursts of
+# updates (or everything queued before the page loads) cost a single IPC call.
+class JsBridge:
+    def __init__(self, run_js: RunJs) -> None:
+        self._run_js = run_js
+        self._state: dict[Channel, dict[str, Any]] = {}
+        self._ready = False
+        self._flush_scheduled = False
+        self._traced: list[int] = []
+        self._awaiting_ack: set[int] = set()
+        self._ack_polls = 0
+
+    def post(self, channel: Channel, **values: Any) -> None:
+        self._state.setdefault(channel, {}).update(values)
+        self._schedule_flush()
+
+    def trace(self, update_id: int) -> None:
+        # Asks the page to acknowledge the next flush once it has been painted.
+        self._traced.append(update_id)
+
+    def reset(self) -> None:
+        # The page is being replaced; its initial state comes from the template.
+        self._state.clear()
+        self._ready = False
+        for update_id in self._traced + list(self._awaiting_ack):
+            tracer.finish_update(update_id, outcome="page reloaded")
+        self._traced.clear()
+        self._awaiting_ack.clear()
+
+    def set_ready(self) -> None:
+        self._ready = True
+        self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        if self._ready and not self._flush_scheduled and self._state:
+            self._flush_scheduled = True
+            QTimer.singleShot(0, self._flush)
+
+    @diagnostics.timed("bridge.run_js")
+    def _flush(self) -> None:
+        self._flush_scheduled = False
+        if not self._ready or not self._state:
+            return
+        state: dict[str, Any] = dict(self._state)
+        if self._traced:
+            state["trace"] = self._traced
+        payload = json.dumps(state)
+        self._state.clear()
+        diagnostics.count("bridge.messages")
+        diagnostics.count("bridge.payload_bytes", len(payload))
+        if not self._traced:
+            self._run_js(f"progressCircle.applyState({payload})")
+            return
+        self._awaiting_ack.update(self._traced)
+        self._traced = []
+        self._ack_polls = 0
+        self._run_js(f"progressCircle.applyState({payload})", lambda _: self._poll_acks())
+
+    def _poll_acks(self) -> None:
+        self._run_js("progressCircle.takeFrameAcks()", self._on_acks)
+
+    def _on_acks(self, acks: list[dict[str, Any]] | None) -> None:
+        now = time.perf_counter_ns()
+        for ack in acks or ():
+            update_id = int(ack["id"])
+            if update_id in self._awaiting_ack:
+                self._awaiting_ack.discard(update_id)
+                tracer.page_span("page apply to frame", now, ack["frameMs"], update_id)
+                tracer.finish_update(update_id, painted_by="web")
+        if not self._awaiting_ack:
+            return
+        self._ack_polls += 1
+        if self._ack_polls < _ACK_POLL_LIMIT:
+            QTimer.singleShot(_ACK_POLL_MS, self._poll_acks)
+            return
+        for update_id in self._awaiting_ack:
+            tracer.finish_update(update_id, outcome="unacknowledged")
+        self._awaiting_ack.clear()
@@ -0,0 +1,259 @@
+// Draws and animates the progress circle. The standalone overlay page and the
+// copy injected into Anki's reviewer share it; Python only calls
+// progressCircle.applyState() and progressCircle.takeFrameAcks().
+var progressCircle = (function () {
+  var circumference = $circumference;
+  var timerId = null;
+  var timerAnimations = [];
+  var timerStart = 0;
+  var timerDurationMs = 0;
+  var timerDirection = "countdown";
+  var timerTick = null;
+  var timerIntervalMs = 0;
+  // Set by Python when the overlay is minimized, occluded or closed, and
+  // by the page itself when the browser reports it hidden.
+  var hostSuspended = false;
+  var suspended = false;
+
+  function setDash(dashLength, circ) {
+    circumference = circ;
+    var progress = document.getElementById("progress-circle");
+    var maskProgress = document.getElementById(
+      "progress-circle-mask-progress",
+    );
+
+    progress.setAttribute("stroke-dasharray", dashLength + " " + circ);
+    maskProgress.setAttribute("stroke-dasharray", dashLength + " " + circ);
+  }
+
+  // Appearance keys sent from Python and the attribute each one patches.
+  var appearanceAttributes = {
+    mainColor: [["progress-circle"], "stroke"],
+    mainOpacity: [["progress-circle"], "stroke-opacity"],
+    mainWidth: [
+      ["progress-circle", "progress-circle-mask-progress"],
+      "stroke-width",
+    ],
+    backColor: [["progress-circle-back"], "stroke"],
+    backOpacity: [["progress-circle-back"], "stroke-opacity"],
+    backWidth: [
+      ["progress-circle-back", "progress-circle-mask-back"],
+      "stroke-width",
+    ],
+    linecap: [
+      ["progress-circle", "progress-circle-mask-progress"],
+      "stroke-linecap",
+    ],
+    mask: [["progress-circle-back"], "mask"],
+    radius: [
+      [
+        "progress-circle-back",
+        "progress-circle",
+        "progress-circle-mask-back",
+        "progress-circle-mask-progress",
+      ],
+      "r",
+    ],
+  };
+
+  function applyAppearance(appearance) {
+    Object.keys(appearance).forEach(function (key) {
+      var target = appearanceAttributes[key];
+      var value = appearance[key];
+      target[0].forEach(function (id) {
+        document.getElementById(id).setAttribute(target[1], value);
+      });
+    });
+    if ("mainColor" in appearance) {
+      document.getElementById("progress-circle-caption").style.color =
+        appearance.mainColor;
+    }
+    if ("radius" in appearance) {
+      circumference = 2 * Math.PI * appearance.radius;
+      if (timerAnimations.length > 0) {
+        // Re-seat the running animation on the new circumference.
+        var elapsed = performance.now() - timerStart;
+        startAnimatedTimer(timerDurationMs, timerDirection, elapsed);
+      }
+    }
+  }
+
+  // Traced updates are acknowledged once the frame showing them has been
+  // produced; the bridge collects the acknowledgements with takeFrameAcks.
+  var frameAcks = [];
+
+  function ackAfterFrame(ids) {
+    var received = performance.now();
+    requestAnimationFrame(function () {
+      setTimeout(function () {
+        var frameMs = performance.now() - received;
+        ids.forEach(function (id) {
+          frameAcks.push({ id: id, frameMs: frameMs });
+        });
+      }, 0);
+    });
+  }
+
+  function takeFrameAcks() {
+    var acks = frameAcks;
+    frameAcks = [];
+    return acks;
+  }
+
+  // Single entry point for the Python bridge: one call carries the latest
+  // state of every channel that changed since the previous flush.
+  function applyState(state) {
+    if (state.trace) {
+      ackAfterFrame(state.trace);
+    }
+    if (state.appearance) {
+      applyAppearance(state.appearance);
+    }
+    if (state.lifecycle) {
+      if ("hidden" in state.lifecycle) {
+        document.getElementById("progress-circle-container").hidden =
+          state.lifecycle.hidden;
+      }
+      hostSuspended = state.lifecycle.suspended;
+      updateSuspended();
+    }
+    var timer = state.timer;
+    if (timer) {
+      if (timer.action === "start" && timer.mode === "animated") {
+        startAnimatedTimer(
+          timer.durationMs,
+          timer.direction,
+          timer.elapsedMs,
+        );
+      } else if (timer.action === "start") {
+        startTimer(
+          timer.durationMs,
+          timer.direction,
+          timer.intervalMs,
+          timer.elapsedMs,
+        );
+      } else {
+        stopTimer();
+      }
+    }
+    // After the timer: stopping it freezes the arc where the timer was, and
+    // progress sent in the same flush has to land on top of that.
+    if (state.progress) {
+      setDash(state.progress.dashLength, state.progress.circumference);
+    }
+    if (state.caption) {
+      document.getElementById("progress-circle-caption").textContent =
+        state.caption.text;
+    }
+  }
+
+  function timerFraction() {
+    var elapsed = performance.now() - timerStart;
+    var fraction = Math.min(elapsed / timerDurationMs, 1.0);
+    return timerDirection === "countdown" ? 1.0 - fraction : fraction;
+  }
+
+  function beginTimer(durationMs, direction, elapsedMs) {
+    stopTimer();
+    timerStart = performance.now() - (elapsedMs || 0);
+    timerDurationMs = durationMs;
+    timerDirection = direction;
+  }
+
+  // Stepped mode: rewrites the dash on every tick.
+  function startTimer(durationMs, direction, intervalMs, elapsedMs) {
+    beginTimer(durationMs, direction, elapsedMs);
+    timerIntervalMs = intervalMs;
+    timerTick = function () {
+      setDash(circumference * timerFraction(), circumference);
+      if (performance.now() - timerStart >= durationMs) {
+        stopTimer();
+      }
+    };
+
+    timerTick();
+    if (timerTick !== null && !suspended) {
+      timerId = setInterval(timerTick, intervalMs);
+    }
+  }
+
+  // Animated mode: one declarative animation per stroke over the whole
+  // duration, so no script runs until the timer is stopped.
+  function startAnimatedTimer(durationMs, direction, elapsedMs) {
+    beginTimer(durationMs, direction, elapsedMs);
+    var full = { strokeDasharray: circumference + " " + circumference };
+    var empty = { strokeDasharray: "0 " + circumference };
+    var keyframes =
+      direction === "countdown" ? [full, empty] : [empty, full];
+
+    var ids = ["progress-circle", "progress-circle-mask-progress"];
+    ids.forEach(function (id) {
+      var animation = document
+        .getElementById(id)
+        .animate(keyframes, {
+          duration: durationMs,
+          easing: "linear",
+          fill: "forwards",
+        });
+      animation.currentTime = performance.now() - timerStart;
+      if (suspended) {
+        animation.pause();
+      }
+      timerAnimations.push(animation);
+    });
+  }
+
+  // Nothing ticks while suspended. Resuming catches up from the monotonic
+  // clock in one step instead of replaying the missed ticks.
+  function updateSuspended() {
+    var value = hostSuspended || document.hidden;
+    if (value === suspended) {
+      return;
+    }
+    suspended = value;
+    if (suspended) {
+      if (timerId !== null) {
+        clearInterval(timerId);
+        timerId = null;
+      }
+      timerAnimations.forEach(function (animation) {
+        animation.pause();
+      });
+      return;
+    }
+    if (timerTick !== null) {
+      timerTick();
+      if (timerTick !== null) {
+        timerId = setInterval(timerTick, timerIntervalMs);
+      }
+    }
+    var elapsed = Math.min(performance.now() - timerStart, timerDurationMs);
+    timerAnimations.forEach(function (animation) {
+      animation.currentTime = elapsed;
+      if (elapsed < timerDurationMs) {
+        animation.play();
+      }
+    });
+  }
+
+  document.addEventListener("visibilitychange", updateSuspended);
+
+  function stopTimer() {
+    timerTick = null;
+    if (timerId !== null) {
+      clearInterval(timerId);
+      timerId = null;
+    }
+    if (timerAnimations.length > 0) {
+      // Freeze the arc where the animation was before dropping it.
+      var dashLength = circumference * timerFraction();
+      timerAnimations.forEach(function (animation) {
+        animation.cancel();
+      });
+      timerAnimations = [];
+      setDash(dashLength, circumference);
+    }
+  }
+
+  return { applyState: applyState, takeFrameAcks: takeFrameAcks };
+})();
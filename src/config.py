@@ -1,13 +1,25 @@
 from __future__ import annotations
 
 import enum
-from dataclasses import asdict, dataclass, fields
+from dataclasses import asdict, dataclass, fields, replace
 from typing import Any
 
 
+class ConfigChange(enum.IntEnum):
+    NONE = 0
+    PATCH = 1
+    REBUILD = 2
+
+
+class ProgressSource(enum.StrEnum):
+    QUEUE = "queue"
+    REVLOG = "revlog"
+
+
 class UpdateMode(enum.StrEnum):
     CARDS = "cards"
     PERCENT = "percent"
+    TIME = "time"
 
 
 class TimerDirection(enum.StrEnum):
@@ -20,6 +32,29 @@ class StrokeLinecap(enum.StrEnum):
     ROUND = "round"
 
 
+class TimerMode(enum.StrEnum):
+    ANIMATED = "animated"
+    INTERVAL = "interval"
+
+
+class RendererBackend(enum.StrEnum):
+    WEB = "web"
+    NATIVE = "native"
+
+
+class OverlayGeometry(enum.StrEnum):
+    FULLSCREEN = "fullscreen"
+    COMPACT = "compact"
+
+
+class OverlayAnchor(enum.StrEnum):
+    CENTER = "center"
+    TOP_LEFT = "top_left"
+    TOP_RIGHT = "top_right"
+    BOTTOM_LEFT = "bottom_left"
+    BOTTOM_RIGHT = "bottom_right"
+
+
 @dataclass
 class Config:
     main_color: str
@@ -35,15 +70,37 @@ class Config:
     update_every_mode: UpdateMode
     update_every_n_reviews: int
     update_every_percent_total: int
+    update_every_ms: int
+    show_eta: bool
     stroke_linecap: StrokeLinecap
     timer_duration_minutes: int
     timer_direction: TimerDirection
     timer_interval_ms: int
+    timer_mode: TimerMode
+    reconcile_every_n_reviews: int
+    progress_source: ProgressSource
+    renderer_backend: RendererBackend
+    frame_cache_mb: int
+    embed_in_reviewer: bool
+    overlay_geometry: OverlayGeometry
+    overlay_anchor: OverlayAnchor
+    overlay_size_px: int
+    overlay_margin_px: int
+    overlay_screens: list[str]
+    prewarm_overlay: bool
+    idle_teardown_minutes: int
+    collect_diagnostics: bool
+    trace_updates: bool
 
     def __post_init__(self) -> None:
         self.update_every_mode = UpdateMode(self.update_every_mode)
+        self.progress_source = ProgressSource(self.progress_source)
         self.timer_direction = TimerDirection(self.timer_direction)
+        self.timer_mode = TimerMode(self.timer_mode)
         self.stroke_linecap = StrokeLinecap(self.stroke_linecap)
+        self.renderer_backend = RendererBackend(self.renderer_backend)
+        self.overlay_geometry = OverlayGeometry(self.overlay_geometry)
+        self.overlay_anchor = OverlayAnchor(self.overlay_anchor)
 
     @classmethod
     def from_dict(cls, data: dict[str, Any]) -> Config:
@@ -52,3 +109,37 @@ class Config:
 
     def to_dict(self) -> dict[str, Any]:
         return asdict(self)
+
+
+# Fields the overlay can apply to a live circle by patching attributes.
+_PATCHABLE_FIELDS = frozenset(
+    {
+        "main_color",
+        "main_color_opacity",
+        "main_circle_stroke_width",
+        "back_color",
+        "back_color_opacity",
+        "back_circle_stroke_width",
+        "mask_circles",
+        "hide_main_circle_at_zero",
+        "stroke_linecap",
+        "show_eta",
+    }
+)
+# Fields that need the overlay contents rebuilt from scratch.
+_STRUCTURAL_FIELDS = frozenset({"renderer_backend", "embed_in_reviewer"})
+
+
+def with_appearance(config: Config, appearance: Config) -> Config:
+    # config, with only the live-patchable look taken from appearance.
+    return replace(config, **{name: getattr(appearance, name) for name in _PATCHABLE_FIELDS})
+
+
+def classify_change(old: Config, new: Config) -> ConfigChange:
+    changed = {f.name for f in fields(Config) if getattr(old, f.name) != getattr(new, f.name)}
+    if changed & _STRUCTURAL_FIELDS:
+        return ConfigChange.REBUILD
+    if changed & _PATCHABLE_FIELDS:
+        return ConfigChange.PATCH
+    # Everything else only affects behaviour (refresh cadence, next timer, ...).
+    return ConfigChange.NONE
@@ -1,112 +1,326 @@
-from typing import NamedTuple
+import time
+from dataclasses import replace
+from pathlib import Path
+from typing import Literal
 
 from anki.cards import Card
+from anki.collection import OpChanges
+from anki.consts import QUEUE_TYPE_LRN
 from aqt import gui_hooks, mw
 from aqt.qt import QMenu, QTimer
-
-from .config import Config, UpdateMode
-from .overlay import ProgressOverlay
-
-
-class DeckProgress(NamedTuple):
-    done: int
-    total: int
-    percent: float
+from aqt.reviewer import Reviewer
+from aqt.webview import WebContent
+
+from .config import Config, ConfigChange, ProgressSource, UpdateMode, classify_change
+from .deck_tree import DeckTreeIndex
+from .diagnostics import diagnostics
+from .overlay import OverlayGroup
+from .progress import DeckProgress, ProgressEngine
+from .queue_query import QueueCountQuery, QueueCounts, count_queue_and_revlog
+from .review_rate import ReviewRate, format_eta
+from .reviewer_circle import ReviewerCircle
+from .session_store import SessionEntry, SessionStore
+from .startup import startup_timings
+from .tracing import tracer
+from .update_scheduler import UpdateScheduler
 
 
 class AddonController:
     def __init__(self, package_name: str) -> None:
         self._package_name = package_name
-        self._overlay: ProgressOverlay | None = None
+        self._overlay: OverlayGroup | None = None
+        self._embedded = ReviewerCircle()
+        # Whether the user has the circle switched on, whichever surface
+        # currently draws it.
+        self._circle_wanted = False
         self._mode: str = "review"
 
-        self._deck_goal: dict[int, int] = {}
-        self._deck_done: dict[int, int] = {}
+        self._queue_query = QueueCountQuery(self._on_queue_counted)
+        self._revlog_query = QueueCountQuery(self._on_queue_counted, count_queue_and_revlog)
+        self._user_files = Path(mw.addonManager.addonsFolder(package_name)) / "user_files"
+        self._sessions = SessionStore(self._user_files / "sessions.json")
+        self._update_scheduler = UpdateScheduler(self._update_overlay)
+        self._reset_profile_state()
 
-        self._reviews_since_update: int = 0
+        self._timer: QTimer | None = None
+        self._idle_timer = QTimer()
+        self._idle_timer.setSingleShot(True)
+        self._idle_timer.timeout.connect(self._reclaim_overlay)
+        self._timer_started_at = 0.0
+        self._timer_duration_seconds = 0
+
+    def _reset_profile_state(self) -> None:
+        # Everything that describes the open profile's collection. Deck ids
+        # are only unique within a collection, so none of it may outlive the
+        # profile; each piece fills itself again on first use.
+        self._progress = ProgressEngine()
+        self._deck_tree = DeckTreeIndex()
+        self._review_rate = ReviewRate()
+        self._day = 0
+        self._day_cutoff = 0
+        self._reviews_since_update = 0
         self._last_render_done: int | None = None
         self._last_render_total: int | None = None
-
-        self._timer: QTimer | None = None
         self._config_cache: Config | None = None
 
     def load_config(self) -> Config:
         if self._config_cache is None:
-            self._config_cache = Config.from_dict(
-                mw.addonManager.getConfig(self._package_name)
-            )
+            self._config_cache = Config.from_dict(mw.addonManager.getConfig(self._package_name))
+            self._apply_instrumentation(self._config_cache)
         return self._config_cache
 
     def save_config(self, config: Config) -> None:
         mw.addonManager.writeConfig(self._package_name, config.to_dict())
         self._config_cache = config
+        self._apply_instrumentation(config)
+
+    @staticmethod
+    def _apply_instrumentation(config: Config) -> None:
+        diagnostics.enabled = config.collect_diagnostics
+        tracer.enabled = config.trace_updates
 
     def load_defaults(self) -> Config | None:
         raw = mw.addonManager.addonConfigDefaults(self._package_name)
         return Config.from_dict(raw) if raw else None
 
+    @diagnostics.timed("controller.get_current_progress")
     def get_current_progress(self) -> DeckProgress:
         if not mw.col:
             return DeckProgress(0, 0, 0.0)
 
+        self._check_day_rollover()
         deck_id = mw.col.decks.get_current_id()
-        queued = mw.col.sched.get_queued_cards(fetch_limit=1)
-        remaining = queued.new_count + queued.learning_count + queued.review_count
-
-        if deck_id not in self._deck_goal:
-            self._deck_goal[deck_id] = remaining
-            self._deck_done[deck_id] = 0
-        else:
-            self._deck_done[deck_id] = self._deck_goal[deck_id] - remaining
-
-            # New cards were added mid-session; reset the baseline.
-            if remaining > self._deck_goal[deck_id]:
-                self._deck_goal[deck_id] = remaining
-                self._deck_done[deck_id] = 0
-
-        total = self._deck_goal[deck_id]
-        done = self._deck_done[deck_id]
-        percent = (done / total * 100) if total > 0 else 0.0
-
-        return DeckProgress(done, total, percent)
+        if not self._progress.has_deck(deck_id):
+            self._resume_deck(deck_id)
+        config = self.load_config()
+        query = self._count_query(config)
+        if not query.in_flight and self._progress.needs_reconcile(
+            config.reconcile_every_n_reviews
+        ):
+            # Counted off the UI thread; the overlay is refreshed once it lands.
+            diagnostics.count("controller.reconcile_requests")
+            query.request()
+        return self._progress.progress(deck_id)
+
+    def _awaiting_first_count(self) -> bool:
+        # The current deck has no counter yet and its count is running (this
+        # starts it if needed). Anything drawn now would be an empty circle
+        # that jumps once the count lands, so drawing is left to
+        # _on_queue_counted.
+        if not mw.col or self._mode == "timer":
+            return False
+        self.get_current_progress()
+        return (
+            not self._progress.has_deck(mw.col.decks.get_current_id())
+            and self._count_query(self.load_config()).in_flight
+        )
+
+    def _count_query(self, config: Config) -> QueueCountQuery:
+        if config.progress_source == ProgressSource.REVLOG:
+            return self._revlog_query
+        return self._queue_query
+
+    def _check_day_rollover(self) -> None:
+        if time.time() < self._day_cutoff:
+            return
+        self._day = mw.col.sched.today
+        self._day_cutoff = mw.col.sched.day_cutoff
+        self._progress.clear()
+        self._sessions.expire()
+        self._review_rate.clear()
+
+    def _saved_counter(self, deck_id: int) -> tuple[int, int] | None:
+        entry = self._sessions.get(mw.pm.name, deck_id, self._day)
+        return None if entry is None else (entry.goal, entry.remaining)
+
+    def _resume_deck(self, deck_id: int) -> None:
+        saved = self._saved_counter(deck_id)
+        if saved is not None:
+            self._progress.seed(deck_id, *saved)
+
+    def _remember_decks(self, deck_ids: list[int]) -> None:
+        for deck_id in deck_ids:
+            counter = self._progress.counter(deck_id)
+            if counter is not None:
+                goal, remaining = counter
+                self._sessions.put(
+                    mw.pm.name, deck_id, self._day, SessionEntry(goal, remaining, self._day_cutoff)
+                )
+
+    def _fresh_deck_tree(self) -> DeckTreeIndex:
+        if self._deck_tree.stale:
+            self._deck_tree.rebuild(mw.col)
+        return self._deck_tree
+
+    @diagnostics.timed("controller.on_queue_counted")
+    def _on_queue_counted(self, counts: QueueCounts) -> None:
+        if not mw.col:
+            return
+        studied = None
+        if counts.studied is not None:
+            studied = self._fresh_deck_tree().sum_over_subtrees(counts.studied)
+        deck_id = mw.col.decks.get_current_id()
+        remaining = counts.remaining
+        if deck_id not in remaining:
+            # The due tree can leave a deck out (an empty Default deck, say);
+            # it has been counted all the same, as empty.
+            remaining = {**remaining, deck_id: 0}
+        self._remember_decks(self._progress.reconcile(remaining, studied, self._saved_counter))
+        if self._mode != "timer":
+            self._sync_surfaces()
+            self._update_overlay()
 
     def _mark_rendered(self, done: int, total: int) -> None:
         self._reviews_since_update = 0
         self._last_render_done = done
         self._last_render_total = total
 
+    def _embedding(self) -> bool:
+        # The circle lives in the reviewer page while studying (if it was
+        # injected there) and in the overlay window everywhere else.
+        return (
+            mw.state == "review"
+            and self._embedded.attached
+            and self.load_config().embed_in_reviewer
+        )
+
+    def _active_surface(self) -> OverlayGroup | ReviewerCircle | None:
+        if self._embedded.is_active() and self._embedding():
+            return self._embedded
+        if self._overlay is not None and self._overlay.is_active():
+            return self._overlay
+        return None
+
+    def _displayed_surfaces(self) -> list[OverlayGroup | ReviewerCircle]:
+        surfaces: list[OverlayGroup | ReviewerCircle] = []
+        if self._embedded.is_active():
+            surfaces.append(self._embedded)
+        if self._overlay is not None and self._overlay.isVisible():
+            surfaces.append(self._overlay)
+        return surfaces
+
     def _update_overlay(self) -> None:
-        if self._overlay is None or not self._overlay.isVisible():
+        # Nothing is pushed while the circle can't be seen; it catches up
+        # through _on_overlay_resumed.
+        surface = self._active_surface()
+        if surface is None or self._awaiting_first_count():
             return
         done, total, percent = self.get_current_progress()
-        self._overlay.update_progress(self.load_config(), percent)
+        config = self.load_config()
+        surface.update_progress(config, percent)
+        surface.set_caption(self._caption(config, done, total))
+        self._mark_rendered(done, total)
+
+    def _caption(self, config: Config, done: int, total: int) -> str:
+        if not config.show_eta or self._mode == "timer":
+            return ""
+        return format_eta(self._review_rate, total - done)
+
+    def _render_surface(self, surface: OverlayGroup | ReviewerCircle) -> None:
+        config = self.load_config()
+        done, total, percent = self.get_current_progress()
+        surface.render(config, percent)
+        surface.set_caption(self._caption(config, done, total))
         self._mark_rendered(done, total)
+        if self._mode == "timer":
+            # A rebuild starts from a blank page; resume the timer where it was.
+            surface.start_timer(
+                config, self._timer_duration_seconds, elapsed_ms=self._timer_elapsed_ms()
+            )
 
     def _full_redraw_overlay(self) -> None:
-        if self._overlay is None or not self._overlay.isVisible():
+        for surface in self._displayed_surfaces():
+            self._render_surface(surface)
+
+    def _patch_overlay(self, config: Config) -> None:
+        surfaces = self._displayed_surfaces()
+        if not surfaces:
             return
         done, total, percent = self.get_current_progress()
-        self._overlay.render(self.load_config(), percent)
-        self._mark_rendered(done, total)
+        caption = self._caption(config, done, total)
+        for surface in surfaces:
+            surface.patch_appearance(config, percent, timer_running=self._mode == "timer")
+            surface.set_caption(caption)
+
+    def _apply_config_change(self, change: ConfigChange) -> None:
+        if self._overlay is not None and self._overlay.isVisible():
+            # Moving or resizing the window needs no redraw; it is a no-op
+            # when the placement didn't change.
+            self._overlay.show_placed(self.load_config())
+        if change == ConfigChange.REBUILD:
+            self._sync_surfaces()
+            self._full_redraw_overlay()
+        elif change == ConfigChange.PATCH:
+            self._patch_overlay(self.load_config())
+
+    def _create_overlay(self) -> OverlayGroup:
+        overlay = OverlayGroup(host=mw)
+        overlay.resumed.connect(self._on_overlay_resumed)
+        overlay.windows_added.connect(self._on_overlay_windows_added)
+        return overlay
+
+    def _on_overlay_windows_added(self) -> None:
+        # A screen joined the group; bring every window to the shared state.
+        self._render_surface(self._overlay)
+
+    def _on_overlay_resumed(self) -> None:
+        # Timers catch up inside the renderer; progress needs one fresh push.
+        if self._mode != "timer":
+            self._update_overlay()
 
     def _show_overlay(self) -> None:
+        self._idle_timer.stop()
         if self._overlay is None:
-            self._overlay = ProgressOverlay(None)
-        config = self.load_config()
-        done, total, percent = self.get_current_progress()
-        self._overlay.render(config, percent)
-        self._mark_rendered(done, total)
-        self._overlay.showMaximized()
+            self._overlay = self._create_overlay()
+        self._render_surface(self._overlay)
+        self._overlay.show_placed(self.load_config())
+
+    def _hide_overlay(self) -> None:
+        self._overlay.close()
+        self._schedule_reclaim()
+
+    def _sync_surfaces(self) -> None:
+        # Shows the circle on the surface that fits the current screen and
+        # hides it on the other one. Showing waits for the deck's first count,
+        # which syncs again when it lands.
+        embedding = self._embedding()
+        can_show = self._circle_wanted and not self._awaiting_first_count()
+        if self._embedded.attached:
+            wanted = self._circle_wanted and embedding
+            if self._embedded.is_active() != wanted and (can_show or not wanted):
+                self._embedded.set_shown(wanted)
+                if wanted:
+                    self._render_surface(self._embedded)
+        overlay_shown = self._overlay is not None and self._overlay.isVisible()
+        if self._circle_wanted and not embedding:
+            if not overlay_shown and can_show:
+                self._show_overlay()
+        elif overlay_shown:
+            self._hide_overlay()
 
     def toggle_overlay(self) -> None:
-        if self._overlay is not None and self._overlay.isVisible():
-            self._overlay.close()
-        else:
-            self._show_overlay()
+        self._circle_wanted = not self._circle_wanted
+        self._sync_surfaces()
+
+    def _schedule_reclaim(self) -> None:
+        minutes = self.load_config().idle_teardown_minutes
+        if minutes > 0:
+            self._idle_timer.start(minutes * 60_000)
+
+    def _reclaim_overlay(self) -> None:
+        # A hidden overlay still holds a renderer (for the web backend, a whole
+        # Chromium process). Everything needed to rebuild it lives here, so the
+        # next show restores progress and any running timer exactly.
+        if self._overlay is None or self._overlay.isVisible():
+            return
+        self._overlay.stop_timer()
+        self._overlay.deleteLater()
+        self._overlay = None
+        diagnostics.count("overlay.reclaimed")
 
     def _ensure_overlay_visible(self) -> None:
-        if self._overlay is None or not self._overlay.isVisible():
-            self._show_overlay()
+        if not self._circle_wanted:
+            self.toggle_overlay()
 
     def _should_force_update(self, config: Config, done: int, total: int) -> bool:
         if self._last_render_done is None or self._last_render_total is None:
@@ -128,28 +342,100 @@ class AddonController:
 
     # hooks
 
+    @diagnostics.timed("hook.state_did_change")
     def on_state_change(self, state: str, old_state: str) -> None:
+        self._sync_surfaces()
         if self._mode == "timer":
             return
         if state in ("deckBrowser", "overview", "review"):
             self._update_overlay()
 
+    @diagnostics.timed("hook.reviewer_did_show_question")
     def on_review_shown(self, card: Card) -> None:
         if self._mode == "timer":
             return
-        if self._overlay is None or not self._overlay.isVisible():
+        surface = self._active_surface()
+        if surface is None:
             return
 
         done, total, percent = self.get_current_progress()
         config = self.load_config()
+        force = self._should_force_update(config, done, total)
+
+        if config.update_every_mode == UpdateMode.TIME:
+            # Coalesced by time; the trailing update reads progress afresh.
+            self._update_scheduler.request(config.update_every_ms, force=force)
+            return
 
         update_interval = self._compute_update_interval(config, total)
-        force = self._should_force_update(config, done, total)
 
         self._reviews_since_update += 1
         if force or self._reviews_since_update >= update_interval:
-            self._overlay.update_progress(config, percent)
+            surface.update_progress(config, percent)
+            surface.set_caption(self._caption(config, done, total))
             self._mark_rendered(done, total)
+        else:
+            diagnostics.count("controller.updates_skipped")
+            tracer.skip_update()
+
+    @diagnostics.timed("hook.reviewer_did_answer_card")
+    def on_card_answered(self, reviewer: Reviewer, card: Card, ease: Literal[1, 2, 3, 4]) -> None:
+        if not mw.col:
+            return
+        tracer.start_update()
+        self._check_day_rollover()
+        self._review_rate.record(time.monotonic())
+        # The card has been reloaded after answering; intraday learning cards
+        # are still part of today's queue.
+        changed = self._progress.record_answer(
+            self._fresh_deck_tree().lineage(card.did), still_queued=card.queue == QUEUE_TYPE_LRN
+        )
+        # The whole lineage moved, not just the deck being studied.
+        self._remember_decks(changed)
+
+    def on_webview_will_set_content(self, web_content: WebContent, context: object | None) -> None:
+        if not isinstance(context, Reviewer):
+            return
+        config = self.load_config()
+        if not config.embed_in_reviewer:
+            if self._embedded.attached:
+                self._embedded.detach()
+            return
+        # The reviewer page is rebuilt when review starts (and occasionally
+        # mid-review); the circle comes back exactly as it was.
+        _, _, percent = self.get_current_progress()
+        self._embedded.attach(web_content, config, percent, shown=False)
+        self._sync_surfaces()
+
+    def on_reviewer_will_end(self) -> None:
+        # The main webview moves on to a page without the circle; nothing may
+        # be posted to it until review rebuilds the reviewer page.
+        self._embedded.detach()
+
+    def on_profile_will_close(self) -> None:
+        self._sessions.flush()
+        # Counts still running belong to the closing collection.
+        self._queue_query.cancel()
+        self._revlog_query.cancel()
+        self._update_scheduler.cancel()
+        self._reset_profile_state()
+        diagnostics.count("controller.profile_resets")
+
+    @diagnostics.timed("hook.operation_did_execute")
+    def on_operation_executed(self, changes: OpChanges, handler: object | None) -> None:
+        # Answers from the reviewer are counted in on_card_answered; anything
+        # else touching the queues (undo, browser edits, syncs) needs a recount.
+        if changes.deck:
+            self._deck_tree.invalidate()
+        if not changes.study_queues or handler is mw.reviewer:
+            return
+        self._progress.invalidate()
+        query = self._count_query(self.load_config())
+        if query.in_flight:
+            # The count already running may predate this change.
+            query.request()
+        if mw.state != "review" and self._mode != "timer":
+            self._update_overlay()
 
     # Timer
 
@@ -159,7 +445,12 @@ class AddonController:
 
         self._ensure_overlay_visible()
         self._mode = "timer"
-        self._overlay.start_timer(config, duration_seconds)
+        self._update_scheduler.cancel()
+        self._timer_started_at = time.monotonic()
+        self._timer_duration_seconds = duration_seconds
+        for surface in self._displayed_surfaces():
+            surface.start_timer(config, duration_seconds)
+            surface.set_caption("")
 
         if self._timer is not None:
             self._timer.stop()
@@ -172,13 +463,24 @@ class AddonController:
         if self._timer is not None:
             self._timer.stop()
             self._timer = None
-        if self._overlay is not None:
-            self._overlay.stop_timer()
+        self._stop_surface_timers()
         self._mode = "review"
         self._update_overlay()
 
+    def _stop_surface_timers(self) -> None:
+        if self._overlay is not None:
+            self._overlay.stop_timer()
+        if self._embedded.attached:
+            self._embedded.stop_timer()
+
+    def _timer_elapsed_ms(self) -> int:
+        return int((time.monotonic() - self._timer_started_at) * 1000)
+
     def _on_timer_finished(self) -> None:
         self._timer = None
+        # A finished animated timer keeps holding the arc; drop it so progress
+        # shows again.
+        self._stop_surface_timers()
         self._mode = "review"
         self._update_overlay()
 
@@ -194,6 +496,7 @@ class AddonController:
         menu.addAction("Stop timer").triggered.connect(self.stop_timer)
         menu.addSeparator()
         menu.addAction("Circle settings...").triggered.connect(self._open_settings)
+        menu.addAction("Diagnostics...").triggered.connect(self._open_diagnostics)
 
     def _open_settings(self) -> None:
         from .settings_gui import SettingsDialog
@@ -203,19 +506,54 @@ class AddonController:
         defaults = self.load_defaults()
 
         def on_save(new_config: Config) -> None:
+            change = classify_change(config, new_config)
             self.save_config(new_config)
-            self._full_redraw_overlay()
-
-        dialog = SettingsDialog(config, defaults, on_save)
+            if new_config.progress_source != config.progress_source:
+                # The counters (and any count in flight) come from the old
+                # source; recount from the new one before showing them again.
+                self._count_query(config).cancel()
+                self._progress.invalidate()
+                self.get_current_progress()
+            self._apply_config_change(change)
+
+        # Appearance edits are patched onto the visible overlay as they happen;
+        # Cancel patches the saved look back.
+        dialog = SettingsDialog(config, defaults, on_save, self._patch_overlay)
         dialog.exec()
 
-    def _open_on_startup(self) -> None:
-        if self.load_config().open_on_startup:
-            self.toggle_overlay()
+    def _open_diagnostics(self) -> None:
+        from .diagnostics_gui import DiagnosticsDialog
+
+        def on_toggle(option: str, enabled: bool) -> None:
+            self.save_config(replace(self.load_config(), **{option: enabled}))
+
+        trace_path = self._user_files / "trace.json"
+        DiagnosticsDialog(diagnostics, tracer, on_toggle, trace_path, mw).exec()
+
+    def _on_main_window_init(self) -> None:
+        with startup_timings.measure("menu"):
+            self._add_menu()
+        # Nothing heavy runs while Anki is starting up; the overlay is built on
+        # first toggle, or once the event loop is idle if asked to.
+        QTimer.singleShot(0, self._after_startup)
+
+    def _after_startup(self) -> None:
+        config = self.load_config()
+        if config.open_on_startup:
+            with startup_timings.measure("open on startup", deferred=True):
+                self.toggle_overlay()
+        elif config.prewarm_overlay and self._overlay is None:
+            with startup_timings.measure("prewarm", deferred=True):
+                self._overlay = self._create_overlay()
+                self._overlay.prewarm(config)
 
     def register_hooks(self) -> None:
         mw.addonManager.setConfigAction(self._package_name, self._open_settings)
         gui_hooks.state_did_change.append(self.on_state_change)
         gui_hooks.reviewer_did_show_question.append(self.on_review_shown)
-        gui_hooks.main_window_did_init.append(self._add_menu)
-        gui_hooks.main_window_did_init.append(self._open_on_startup)
+        gui_hooks.reviewer_did_answer_card.append(self.on_card_answered)
+        gui_hooks.operation_did_execute.append(self.on_operation_executed)
+        gui_hooks.webview_will_set_content.append(self.on_webview_will_set_content)
+        gui_hooks.reviewer_will_end.append(self.on_reviewer_will_end)
+        gui_hooks.main_window_did_init.append(self._on_main_window_init)
+        gui_hooks.profile_will_close.append(self.on_profile_will_close)
@@ -0,0 +1,62 @@
+from anki.collection import Collection
+
+_SEPARATOR = "::"
+
+
+# Parent/descendant lookups for the deck hierarchy, built from deck names in
+# one backend call and kept until decks are added, renamed or removed.
+class DeckTreeIndex:
+    def __init__(self) -> None:
+        self._parent: dict[int, int | None] = {}
+        self._children: dict[int, list[int]] = {}
+        self._subtree_cache: dict[int, tuple[int, ...]] = {}
+        self._lineage_cache: dict[int, tuple[int, ...]] = {}
+        self._stale = True
+
+    @property
+    def stale(self) -> bool:
+        return self._stale
+
+    def invalidate(self) -> None:
+        self._stale = True
+
+    def rebuild(self, col: Collection) -> None:
+        decks = col.decks.all_names_and_ids(skip_empty_default=False, include_filtered=True)
+        ids_by_name = {deck.name: deck.id for deck in decks}
+        self._parent = {}
+        self._children = {deck.id: [] for deck in decks}
+        for deck in decks:
+            parent_name, _, _ = deck.name.rpartition(_SEPARATOR)
+            parent_id = ids_by_name.get(parent_name) if parent_name else None
+            self._parent[deck.id] = parent_id
+            if parent_id is not None:
+                self._children[parent_id].append(deck.id)
+        self._subtree_cache.clear()
+        self._lineage_cache.clear()
+        self._stale = False
+
+    def lineage(self, deck_id: int) -> tuple[int, ...]:
+        # The deck itself followed by its ancestors up to the root.
+        cached = self._lineage_cache.get(deck_id)
+        if cached is None:
+            chain = []
+            current: int | None = deck_id
+            while current is not None:
+                chain.append(current)
+                current = self._parent.get(current)
+            cached = self._lineage_cache[deck_id] = tuple(chain)
+        return cached
+
+    def subtree(self, deck_id: int) -> tuple[int, ...]:
+        cached = self._subtree_cache.get(deck_id)
+        if cached is None:
+            ids = [deck_id]
+            for child in self._children.get(deck_id, ()):
+                ids.extend(self.subtree(child))
+            cached = self._subtree_cache[deck_id] = tuple(ids)
+        return cached
+
+    def sum_over_subtrees(self, own: dict[int, int]) -> dict[int, int]:
+        return {
+            deck_id: sum(own.get(d, 0) for d in self.subtree(deck_id)) for deck_id in self._parent
+        }
@@ -0,0 +1,102 @@
+import json
+import time
+from bisect import bisect_left
+from collections import Counter
+from collections.abc import Callable
+from functools import wraps
+from typing import Any, ParamSpec, TypeVar
+
+from .startup import startup_timings
+from .tracing import tracer
+
+_P = ParamSpec("_P")
+_R = TypeVar("_R")
+
+# Upper bounds of the latency buckets, in microseconds; the last bucket is open.
+_BUCKET_BOUNDS_US = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10_000, 25_000, 50_000, 100_000)
+
+
+class _Histogram:
+    __slots__ = ("buckets", "count", "max_ns", "total_ns")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.buckets = [0] * (len(_BUCKET_BOUNDS_US) + 1)
+
+    def add(self, elapsed_ns: int) -> None:
+        self.count += 1
+        self.total_ns += elapsed_ns
+        self.max_ns = max(self.max_ns, elapsed_ns)
+        self.buckets[bisect_left(_BUCKET_BOUNDS_US, elapsed_ns / 1000)] += 1
+
+    def as_dict(self) -> dict[str, Any]:
+        labels = [f"<={bound}" for bound in _BUCKET_BOUNDS_US] + [f">{_BUCKET_BOUNDS_US[-1]}"]
+        return {
+            "count": self.count,
+            "mean_us": round(self.total_ns / self.count / 1000, 2) if self.count else 0,
+            "max_us": round(self.max_ns / 1000, 2),
+            "buckets_us": {label: n for label, n in zip(labels, self.buckets) if n},
+        }
+
+
+# Counters and latency histograms for the add-on's hot paths. Collection is
+# off unless the user turns it on; while off, every probe is a single
+# attribute check. Timed probes also feed the tracer when it is on.
+class Diagnostics:
+    def __init__(self) -> None:
+        self.enabled = False
+        self._counters: Counter[str] = Counter()
+        self._latencies: dict[str, _Histogram] = {}
+        self._since = time.time()
+
+    def count(self, name: str, n: int = 1) -> None:
+        if self.enabled:
+            self._counters[name] += n
+
+    def record(self, name: str, elapsed_ns: int) -> None:
+        if not self.enabled:
+            return
+        histogram = self._latencies.get(name)
+        if histogram is None:
+            histogram = self._latencies[name] = _Histogram()
+        histogram.add(elapsed_ns)
+
+    def timed(self, name: str) -> Callable[[Callable[_P, _R]], Callable[_P, _R]]:
+        def decorate(func: Callable[_P, _R]) -> Callable[_P, _R]:
+            @wraps(func)
+            def wrapper(*args: _P.args, **kwargs: _P.kwargs) -> _R:
+                if not (self.enabled or tracer.enabled):
+                    return func(*args, **kwargs)
+                start = time.perf_counter_ns()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    end = time.perf_counter_ns()
+                    self.record(name, end - start)
+                    tracer.complete(name, start, end)
+
+            return wrapper
+
+        return decorate
+
+    def reset(self) -> None:
+        self._counters.clear()
+        self._latencies.clear()
+        self._since = time.time()
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "collecting_for_s": round(time.time() - self._since, 1),
+            "counters": dict(sorted(self._counters.items())),
+            "latency": {name: h.as_dict() for name, h in sorted(self._latencies.items())},
+            "startup": startup_timings.as_dict(),
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.as_dict(), indent=2)
+
+
+diagnostics = Diagnostics()
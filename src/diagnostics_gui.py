@@ -0,0 +1,120 @@
+from collections.abc import Callable
+from pathlib import Path
+
+from aqt.qt import (
+    QApplication,
+    QCheckBox,
+    QDialog,
+    QDialogButtonBox,
+    QFileDialog,
+    QFontDatabase,
+    QLabel,
+    QPlainTextEdit,
+    Qt,
+    QVBoxLayout,
+    QWidget,
+)
+
+from .diagnostics import Diagnostics
+from .startup import startup_timings
+from .tracing import Tracer
+
+
+class DiagnosticsDialog(QDialog):
+    def __init__(
+        self,
+        diagnostics: Diagnostics,
+        tracer: Tracer,
+        on_toggle: Callable[[str, bool], None],
+        trace_path: Path,
+        parent: QWidget | None = None,
+    ) -> None:
+        super().__init__(parent)
+        self.setWindowTitle("Circle diagnostics")
+        self.resize(560, 520)
+        self._diagnostics = diagnostics
+        self._tracer = tracer
+        self._on_toggle = on_toggle
+        self._trace_path = trace_path
+        self._build_ui()
+        self._refresh()
+
+    def _build_ui(self) -> None:
+        layout = QVBoxLayout()
+
+        self._enabled_check = QCheckBox("Collect timings while reviewing")
+        self._enabled_check.setChecked(self._diagnostics.enabled)
+        self._enabled_check.toggled.connect(
+            lambda enabled: self._toggle("collect_diagnostics", enabled)
+        )
+        layout.addWidget(self._enabled_check)
+
+        self._trace_check = QCheckBox("Trace answer-to-paint latency")
+        self._trace_check.setChecked(self._tracer.enabled)
+        self._trace_check.toggled.connect(lambda enabled: self._toggle("trace_updates", enabled))
+        layout.addWidget(self._trace_check)
+
+        hint = QLabel(
+            "Counts and latency histograms for the add-on's hooks, overlay updates and page "
+            "loads since collection started. Attach the JSON when reporting slow reviews. "
+            "Traces open in chrome://tracing or ui.perfetto.dev."
+        )
+        hint.setWordWrap(True)
+        layout.addWidget(hint)
+
+        # What the add-on added to Anki's startup, readable without the JSON.
+        self._startup = QLabel()
+        self._startup.setWordWrap(True)
+        self._startup.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse)
+        layout.addWidget(self._startup)
+
+        self._report = QPlainTextEdit()
+        self._report.setReadOnly(True)
+        self._report.setFont(QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont))
+        self._report.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+        layout.addWidget(self._report, 1)
+
+        button_box = QDialogButtonBox()
+        button_box.addButton("Refresh", QDialogButtonBox.ButtonRole.ActionRole).clicked.connect(
+            self._refresh
+        )
+        button_box.addButton("Reset", QDialogButtonBox.ButtonRole.ResetRole).clicked.connect(
+            self._reset
+        )
+        button_box.addButton("Copy JSON", QDialogButtonBox.ButtonRole.ActionRole).clicked.connect(
+            self._copy
+        )
+        button_box.addButton(
+            "Save trace...", QDialogButtonBox.ButtonRole.ActionRole
+        ).clicked.connect(self._save_trace)
+        button_box.addButton(QDialogButtonBox.StandardButton.Close)
+        button_box.rejected.connect(self.reject)
+        layout.addWidget(button_box)
+
+        self.setLayout(layout)
+
+    def _toggle(self, option: str, enabled: bool) -> None:
+        self._on_toggle(option, enabled)
+        self._refresh()
+
+    def _refresh(self) -> None:
+        self._startup.setText(startup_timings.report())
+        self._report.setPlainText(self._diagnostics.to_json())
+
+    def _reset(self) -> None:
+        self._diagnostics.reset()
+        self._tracer.clear()
+        self._refresh()
+
+    def _copy(self) -> None:
+        self._refresh()
+        QApplication.clipboard().setText(self._report.toPlainText())
+
+    def _save_trace(self) -> None:
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Save trace", str(self._trace_path), "Trace event JSON (*.json)"
+        )
+        if path:
+            self._trace_path = Path(path)
+            self._trace_path.parent.mkdir(parents=True, exist_ok=True)
+            self._tracer.export(self._trace_path)
@@ -0,0 +1,517 @@
+import math
+from collections import OrderedDict
+from collections.abc import Hashable
+
+from aqt.qt import (
+    QColor,
+    QElapsedTimer,
+    QFont,
+    QGraphicsDropShadowEffect,
+    QGraphicsScene,
+    QPainter,
+    QPainterPath,
+    QPainterPathStroker,
+    QPaintEvent,
+    QPixmap,
+    QPoint,
+    QPointF,
+    QRect,
+    QRectF,
+    QSizeF,
+    Qt,
+    QTimer,
+    QTransform,
+    QWidget,
+)
+
+from .config import Config, RendererBackend, StrokeLinecap, TimerDirection, TimerMode
+from .diagnostics import diagnostics
+from .renderer import VIEWBOX_SIZE, compute_geometry, resolve_appearance
+from .tracing import tracer
+
+# Mirrors the .progress-circle-container rule in circle.css (95vmin, centred).
+_CONTAINER_SCALE = 0.95
+
+# Mirrors `drop-shadow(0 4px 20px rgba(0, 0, 0, 0.3))`. The CSS filter is
+# applied before the svg's rotate(-90deg), so the 4px offset ends up on x.
+_SHADOW_OFFSET = QPointF(4, 0)
+_SHADOW_BLUR = 20
+_SHADOW_ALPHA = 0.3
+
+# Animated timers repaint at most once per frame of a 60 Hz display.
+_FRAME_MS = 16
+
+# How closely painted strokes follow their curves, in device pixels. Qt's
+# default (0.25 of a viewBox unit) leaves facets of a few pixels on a large
+# overlay, and they shift with the arc's length, so a patched frame wouldn't
+# match a whole one.
+_CURVE_TOLERANCE_PX = 0.05
+
+
+def _stroke(
+    path: QPainterPath, width: float, cap: Qt.PenCapStyle, curve_threshold: float = 0.25
+) -> QPainterPath:
+    stroker = QPainterPathStroker()
+    stroker.setWidth(width)
+    stroker.setCurveThreshold(curve_threshold)
+    stroker.setCapStyle(cap)
+    return stroker.createStroke(path)
+
+
+def _color(name: str, opacity: float) -> QColor:
+    color = QColor(name)
+    color.setAlphaF(max(0.0, min(1.0, opacity)))
+    return color
+
+
+def _viewbox_transform(bounds: QRectF) -> QTransform:
+    # Maps viewBox units, centred on the origin, onto the container in bounds.
+    side = min(bounds.width(), bounds.height()) * _CONTAINER_SCALE
+    transform = QTransform()
+    transform.translate(bounds.center().x(), bounds.center().y())
+    transform.scale(side / VIEWBOX_SIZE, side / VIEWBOX_SIZE)
+    return transform
+
+
+def arc_change_rect(bounds: QRectF, config: Config, start: float, end: float) -> QRect:
+    # The part of the widget that can differ when the arc's end moves from
+    # one fraction to another, shadow included.
+    radius, _ = compute_geometry(config)
+    circle = QRectF(-radius, -radius, 2 * radius, 2 * radius)
+    low, high = sorted((max(0.0, min(1.0, start)), max(0.0, min(1.0, end))))
+    sweep = QPainterPath()
+    sweep.arcMoveTo(circle, 90 - 360 * low)
+    sweep.arcTo(circle, 90 - 360 * low, -360 * (high - low))
+    # Round caps reach half a stroke past the arc's end, and masking cuts the
+    # background ring, so cover the wider of the two strokes.
+    width = max(config.main_circle_stroke_width, config.back_circle_stroke_width)
+    shape = _stroke(sweep, width, Qt.PenCapStyle.RoundCap)
+    rect = _viewbox_transform(bounds).mapRect(shape.boundingRect())
+    reach = _shadow_reach()
+    return rect.adjusted(-reach, -reach, reach, reach).toAlignedRect()
+
+
+def paint_circle(
+    painter: QPainter,
+    bounds: QRectF,
+    config: Config,
+    fraction: float,
+    opacity: float,
+    masked: bool,
+) -> None:
+    painter.save()
+    painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+    transform = _viewbox_transform(bounds)
+    painter.setTransform(transform, combine=True)
+    threshold = _CURVE_TOLERANCE_PX / (transform.m11() * painter.device().devicePixelRatioF())
+
+    # From here on we draw in viewBox units with the circle centred on the origin.
+    radius, _ = compute_geometry(config)
+    circle = QRectF(-radius, -radius, 2 * radius, 2 * radius)
+    round_cap = config.stroke_linecap == StrokeLinecap.ROUND
+    cap = Qt.PenCapStyle.RoundCap if round_cap else Qt.PenCapStyle.FlatCap
+
+    ring = QPainterPath()
+    ring.addEllipse(circle)
+    back_shape = _stroke(ring, config.back_circle_stroke_width, Qt.PenCapStyle.FlatCap, threshold)
+
+    fraction = max(0.0, min(1.0, fraction))
+    arc_shape = QPainterPath()
+    if fraction > 0:
+        # Start at 12 o'clock and sweep clockwise, like the rotated svg circle.
+        arc = QPainterPath()
+        arc.arcMoveTo(circle, 90)
+        arc.arcTo(circle, 90, -360 * fraction)
+        arc_shape = _stroke(arc, config.main_circle_stroke_width, cap, threshold)
+    elif round_cap:
+        # A zero-length dash with round caps still paints a dot in SVG.
+        half = config.main_circle_stroke_width / 2
+        arc_shape.addEllipse(QPointF(0, -radius), half, half)
+
+    if masked:
+        back_shape = back_shape.subtracted(arc_shape)
+
+    painter.fillPath(back_shape, _color(config.back_color, config.back_color_opacity / 100))
+    painter.fillPath(arc_shape, _color(config.main_color, opacity))
+    painter.restore()
+
+
+def _shadow_reach() -> float:
+    return _SHADOW_BLUR + max(abs(_SHADOW_OFFSET.x()), abs(_SHADOW_OFFSET.y())) + 1
+
+
+def frame_rect(bounds: QRectF) -> QRect:
+    # The circle's square plus room for its shadow; the rest of the widget
+    # stays transparent and is never drawn.
+    side = min(bounds.width(), bounds.height()) * _CONTAINER_SCALE
+    square = QRectF(0, 0, side, side)
+    square.moveCenter(bounds.center())
+    reach = _shadow_reach()
+    return square.adjusted(-reach, -reach, reach, reach).toAlignedRect() & bounds.toAlignedRect()
+
+
+def device_rect(rect: QRect, origin: QPoint, dpr: float) -> QRect:
+    # rect, in widget coordinates, as device pixels of a frame placed at origin.
+    logical = QRectF(rect.translated(-origin))
+    return QRectF(logical.topLeft() * dpr, logical.size() * dpr).toAlignedRect()
+
+
+def logical_grid(dpr: float) -> int:
+    # The smallest run of device pixels spanning a whole number of logical
+    # ones. The shadow effect works in logical pixels, so parts of a frame are
+    # cut on this grid to come out identical to the whole frame.
+    for pixels in range(1, 65):
+        logical = pixels / dpr
+        if abs(logical - round(logical)) < 1e-6:
+            return pixels
+    return 1
+
+
+def render_frame(
+    bounds: QRectF,
+    frame: QRect,
+    dpr: float,
+    config: Config,
+    fraction: float,
+    opacity: float,
+    masked: bool,
+    part: QRect | None = None,
+) -> QPixmap:
+    # The circle plus shadow for the frame at `frame`, or only the `part` of
+    # it given in the frame's device pixels (starting on the logical grid).
+    full = QRect(0, 0, math.ceil(frame.width() * dpr), math.ceil(frame.height() * dpr))
+    part = full if part is None else part & full
+    # Shadow pixels depend on circle pixels up to the blur's reach away, so
+    # the circle is drawn that much beyond the part. Everything is placed on
+    # whole device pixels, which keeps a part identical to the same pixels of
+    # a whole frame.
+    grid = logical_grid(dpr)
+    reach = math.ceil(_shadow_reach() * dpr / grid) * grid
+    source = part.adjusted(-reach, -reach, reach, reach) & full
+    circle = QPixmap(source.size())
+    circle.setDevicePixelRatio(dpr)
+    circle.fill(Qt.GlobalColor.transparent)
+    painter = QPainter(circle)
+    origin = QPointF(frame.topLeft()) + QPointF(source.topLeft()) / dpr
+    paint_circle(painter, bounds.translated(-origin), config, fraction, opacity, masked)
+    painter.end()
+
+    # Graphics effects only run on widgets or inside a scene; a throwaway
+    # scene bakes in the same shadow the widget effect used to draw live.
+    shadow = QGraphicsDropShadowEffect()
+    shadow.setOffset(_SHADOW_OFFSET)
+    shadow.setBlurRadius(_SHADOW_BLUR)
+    shadow.setColor(_color("#000000", _SHADOW_ALPHA))
+    scene = QGraphicsScene()
+    scene.addPixmap(circle).setGraphicsEffect(shadow)
+
+    result = QPixmap(part.size())
+    result.setDevicePixelRatio(dpr)
+    result.fill(Qt.GlobalColor.transparent)
+    painter = QPainter(result)
+    area = QRectF(QPointF(part.topLeft() - source.topLeft()) / dpr, QSizeF(part.size()) / dpr)
+    scene.render(painter, QRectF(QPointF(0, 0), area.size()), area)
+    painter.end()
+    return result
+
+
+# Patches that move a frame from one arc step to another (the region the
+# arc's end sweeps over, shadow included), least recently used first out once
+# over budget. They only make sense for one appearance and widget size, so a
+# change of either drops them all.
+class FrameCache:
+    def __init__(self) -> None:
+        self._patches: OrderedDict[tuple[int, int], tuple[QRect, QPixmap]] = OrderedDict()
+        self._key: Hashable = None
+        self._bytes = 0
+        self._budget_bytes = 0
+
+    def use(self, key: Hashable, budget_bytes: int) -> None:
+        if key != self._key:
+            self.clear()
+            self._key = key
+        self._budget_bytes = budget_bytes
+        self._trim()
+
+    def __contains__(self, steps: tuple[int, int]) -> bool:
+        return steps in self._patches
+
+    def get(self, steps: tuple[int, int]) -> tuple[QRect, QPixmap] | None:
+        patch = self._patches.get(steps)
+        if patch is not None:
+            self._patches.move_to_end(steps)
+        return patch
+
+    def put(self, steps: tuple[int, int], patch: tuple[QRect, QPixmap]) -> None:
+        self._patches[steps] = patch
+        self._bytes += _pixmap_bytes(patch[1])
+        self._trim()
+
+    def _trim(self) -> None:
+        while self._patches and self._bytes > self._budget_bytes:
+            _, (_, pixmap) = self._patches.popitem(last=False)
+            self._bytes -= _pixmap_bytes(pixmap)
+
+    def clear(self) -> None:
+        self._patches.clear()
+        self._bytes = 0
+
+
+def _pixmap_bytes(pixmap: QPixmap) -> int:
+    return pixmap.width() * pixmap.height() * 4
+
+
+class _CircleWidget(QWidget):
+    def __init__(self, parent: QWidget | None = None) -> None:
+        super().__init__(parent)
+        self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
+        self.config: Config | None = None
+        self.fraction = 0.0
+        self.opacity = 0.0
+        self.masked = False
+        self.traced: list[int] = []
+        self.caption = ""
+        self.frames = FrameCache()
+        # The one full frame kept, the step it shows and the appearance it
+        # was drawn with; other steps are patched into it.
+        self._frame: QPixmap | None = None
+        self._frame_step = 0
+        self._frame_key: Hashable = None
+
+    def step_count(self) -> int:
+        # One step per device pixel of arc: finer differences can't be seen.
+        side = min(self.width(), self.height()) * _CONTAINER_SCALE
+        return max(1, math.ceil(math.pi * side * self.devicePixelRatioF()))
+
+    def step_of(self, fraction: float) -> int:
+        return round(max(0.0, min(1.0, fraction)) * self.step_count())
+
+    def _appearance_key(self) -> Hashable:
+        config = self.config
+        return (
+            config.main_color,
+            self.opacity,
+            config.main_circle_stroke_width,
+            config.back_color,
+            config.back_color_opacity,
+            config.back_circle_stroke_width,
+            config.stroke_linecap,
+            self.masked,
+            self.size(),
+            self.devicePixelRatioF(),
+        )
+
+    def _render(self, step: int, part: QRect | None = None) -> QPixmap:
+        bounds = QRectF(self.rect())
+        return render_frame(
+            bounds,
+            frame_rect(bounds),
+            self.devicePixelRatioF(),
+            self.config,
+            step / self.step_count(),
+            self.opacity,
+            self.masked,
+            part,
+        )
+
+    def _patch(self, start: int, end: int) -> tuple[QRect, QPixmap]:
+        bounds = QRectF(self.rect())
+        count = self.step_count()
+        changed = arc_change_rect(bounds, self.config, start / count, end / count)
+        dpr = self.devicePixelRatioF()
+        part = device_rect(changed, frame_rect(bounds).topLeft(), dpr)
+        grid = logical_grid(dpr)
+        part.setTopLeft(QPoint(part.left() // grid * grid, part.top() // grid * grid))
+        part &= QRect(QPoint(0, 0), self._frame.size())
+        return part, self._render(end, part)
+
+    def frame(self, step: int) -> QPixmap:
+        key = self._appearance_key()
+        self.frames.use(key, self.config.frame_cache_mb * 1024 * 1024)
+        if self._frame is None or key != self._frame_key:
+            diagnostics.count("native.frame_misses")
+            self._frame = self._render(step)
+            self._frame_step = step
+            self._frame_key = key
+            return self._frame
+        if step == self._frame_step:
+            return self._frame
+        patch = self.frames.get((self._frame_step, step))
+        if patch is None:
+            diagnostics.count("native.frame_patches")
+            patch = self._patch(self._frame_step, step)
+        else:
+            diagnostics.count("native.frame_hits")
+        part, pixmap = patch
+        # Copied in device pixels, replacing what was there.
+        dpr = self._frame.devicePixelRatio()
+        self._frame.setDevicePixelRatio(1.0)
+        pixmap.setDevicePixelRatio(1.0)
+        painter = QPainter(self._frame)
+        painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_Source)
+        painter.drawPixmap(part.topLeft(), pixmap)
+        painter.end()
+        pixmap.setDevicePixelRatio(dpr)
+        self._frame.setDevicePixelRatio(dpr)
+        self._frame_step = step
+        return self._frame
+
+    def prerender(self, fraction: float) -> None:
+        if self.config is None or self._frame is None:
+            return
+        self.frames.use(self._appearance_key(), self.config.frame_cache_mb * 1024 * 1024)
+        # From the step being shown, which the frame is at once painted.
+        steps = (self.step_of(self.fraction), self.step_of(fraction))
+        if steps[0] != steps[1] and steps not in self.frames:
+            self.frames.put(steps, self._patch(*steps))
+
+    @diagnostics.timed("native.paint")
+    def paintEvent(self, event: QPaintEvent) -> None:
+        if self.config is None:
+            return
+        painter = QPainter(self)
+        painter.drawPixmap(
+            frame_rect(QRectF(self.rect())).topLeft(), self.frame(self.step_of(self.fraction))
+        )
+        if self.caption:
+            self._paint_caption(painter)
+        painter.end()
+        for update_id in self.traced:
+            tracer.finish_update(update_id, painted_by="native")
+        self.traced.clear()
+
+    def _paint_caption(self, painter: QPainter) -> None:
+        # Mirrors .progress-circle-caption in circle.css (600 weight, 4.5vmin).
+        font = QFont(painter.font())
+        font.setWeight(QFont.Weight.DemiBold)
+        font.setPixelSize(max(1, round(min(self.width(), self.height()) * 0.045)))
+        painter.setFont(font)
+        painter.setPen(QColor(self.config.main_color))
+        painter.drawText(self.rect(), Qt.AlignmentFlag.AlignCenter, self.caption)
+
+
+class NativeRenderer:
+    backend = RendererBackend.NATIVE
+
+    def __init__(self) -> None:
+        self.widget = self._circle = _CircleWidget()
+
+        self._timer = QTimer(self._circle)
+        self._timer.timeout.connect(self._tick)
+        self._elapsed = QElapsedTimer()
+        self._duration_ms = 0
+        self._offset_ms = 0
+        self._countdown = True
+        self._tick_interval_ms = 0
+        self._active = True
+
+        # Progress moves in even steps (every N cards or N percent), so the
+        # frame after the one just shown is drawn ahead while Anki is idle.
+        self._last_fraction: float | None = None
+        self._next_fraction: float | None = None
+        self._prerender_timer = QTimer(self._circle)
+        self._prerender_timer.setSingleShot(True)
+        self._prerender_timer.timeout.connect(self._prerender_next)
+
+    def _set_state(self, config: Config, fraction: float, opacity: float, masked: bool) -> None:
+        circle = self._circle
+        if (circle.config, circle.opacity, circle.masked) == (config, opacity, masked):
+            self._set_fraction(fraction)
+            return
+        circle.config = config
+        circle.fraction = fraction
+        circle.opacity = opacity
+        circle.masked = masked
+        circle.update()
+
+    def _set_fraction(self, fraction: float) -> None:
+        # Only the sector the arc's end swept over is repainted, which keeps
+        # timer ticks from recompositing the whole circle; moves smaller than
+        # a step don't repaint at all.
+        circle = self._circle
+        if circle.step_of(fraction) == circle.step_of(circle.fraction):
+            circle.fraction = fraction
+            return
+        dirty = arc_change_rect(QRectF(circle.rect()), circle.config, circle.fraction, fraction)
+        circle.fraction = fraction
+        circle.update(dirty)
+
+    def _prerender_next(self) -> None:
+        if self._active and self._next_fraction is not None:
+            self._circle.prerender(self._next_fraction)
+
+    def render(self, config: Config, percent: float) -> None:
+        self.stop_timer()
+        self.update_progress(config, percent)
+
+    def update_progress(self, config: Config, percent: float) -> None:
+        opacity, masked = resolve_appearance(config, percent)
+        update_id = tracer.take_update()
+        if update_id is not None:
+            self._circle.traced.append(update_id)
+        fraction = percent / 100
+        self._set_state(config, fraction, opacity, masked)
+        if self._last_fraction is not None and fraction != self._last_fraction:
+            self._next_fraction = 2 * fraction - self._last_fraction
+            if 0.0 <= self._next_fraction <= 1.0:
+                self._prerender_timer.start(0)
+        self._last_fraction = fraction
+
+    def patch_appearance(
+        self, config: Config, percent: float, *, timer_running: bool = False
+    ) -> None:
+        opacity, masked = resolve_appearance(config, percent, force_visible=timer_running)
+        fraction = self._circle.fraction if timer_running else percent / 100
+        self._set_state(config, fraction, opacity, masked)
+
+    def start_timer(self, config: Config, duration_seconds: int, *, elapsed_ms: int = 0) -> None:
+        self.stop_timer()
+        # force_visible=True so hide_main_circle_at_zero doesn't suppress the circle.
+        opacity, masked = resolve_appearance(config, 0.0, force_visible=True)
+        self._set_state(config, self._circle.fraction, opacity, masked)
+
+        self._offset_ms = elapsed_ms
+        self._duration_ms = duration_seconds * 1000
+        self._countdown = config.timer_direction == TimerDirection.COUNTDOWN
+        self._elapsed.start()
+        if config.timer_mode == TimerMode.ANIMATED:
+            self._tick_interval_ms = self._animated_interval_ms()
+        else:
+            self._tick_interval_ms = config.timer_interval_ms
+        self._tick()
+        if self._tick_interval_ms and self._active:
+            self._timer.start(self._tick_interval_ms)
+
+    def _animated_interval_ms(self) -> int:
+        # Step about one device pixel of arc per repaint: finer steps aren't
+        # visible, coarser ones would look stepped.
+        side = min(self._circle.width(), self._circle.height()) * _CONTAINER_SCALE
+        arc_pixels = max(1.0, math.pi * side * self._circle.devicePixelRatioF())
+        return max(_FRAME_MS, int(self._duration_ms / arc_pixels))
+
+    def _tick(self) -> None:
+        elapsed = self._offset_ms + self._elapsed.elapsed()
+        fraction = min(elapsed / self._duration_ms, 1.0)
+        self._set_fraction(1.0 - fraction if self._countdown else fraction)
+        if elapsed >= self._duration_ms:
+            self.stop_timer()
+
+    def set_active(self, active: bool) -> None:
+        # The elapsed timer keeps running while ticks are paused, so the first
+        # tick after resuming lands where the timer should be.
+        self._active = active
+        if not active:
+            self._timer.stop()
+        elif self._tick_interval_ms and not self._timer.isActive():
+            self._tick()
+            if self._tick_interval_ms:
+                self._timer.start(self._tick_interval_ms)
+
+    def stop_timer(self) -> None:
+        self._timer.stop()
+        self._tick_interval_ms = 0
+
+    def set_caption(self, text: str) -> None:
+        if text != self._circle.caption:
+            self._circle.caption = text
+            self._circle.update()
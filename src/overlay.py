@@ -1,20 +1,64 @@
-import math
-from pathlib import Path
-from string import Template
+from aqt.qt import (
+    QDialog,
+    QEvent,
+    QGuiApplication,
+    QHideEvent,
+    QObject,
+    QRect,
+    QScreen,
+    QShowEvent,
+    Qt,
+    QTimer,
+    QVBoxLayout,
+    QWidget,
+    QWindow,
+    pyqtSignal,
+)
 
-from aqt.qt import QDialog, Qt, QVBoxLayout, QWebEngineView, QWidget
+from .config import Config, OverlayAnchor, OverlayGeometry, RendererBackend
+from .diagnostics import diagnostics
+from .renderer import OverlayRenderer, create_renderer
 
-from .config import Config
+# Where the window sits inside the free space of the screen, per axis.
+_ANCHOR_FRACTIONS = {
+    OverlayAnchor.CENTER: (0.5, 0.5),
+    OverlayAnchor.TOP_LEFT: (0.0, 0.0),
+    OverlayAnchor.TOP_RIGHT: (1.0, 0.0),
+    OverlayAnchor.BOTTOM_LEFT: (0.0, 1.0),
+    OverlayAnchor.BOTTOM_RIGHT: (1.0, 1.0),
+}
 
-_HTML_TEMPLATE = Template((Path(__file__).parent / "html_circle.html").read_text())
+
+def compact_geometry(area: QRect, config: Config) -> QRect:
+    # A square window just big enough for the circle (which fills 95% of it,
+    # as in the full-screen overlay), kept inside the screen's margins.
+    side = max(1, min(config.overlay_size_px, area.width(), area.height()))
+    fx, fy = _ANCHOR_FRACTIONS[OverlayAnchor(config.overlay_anchor)]
+
+    def offset(free: int, fraction: float) -> int:
+        margin = max(0, min(config.overlay_margin_px, free // 2))
+        return margin + round((free - 2 * margin) * fraction)
+
+    return QRect(
+        area.left() + offset(area.width() - side, fx),
+        area.top() + offset(area.height() - side, fy),
+        side,
+        side,
+    )
 
 
 class ProgressOverlay(QDialog):
-    _VIEWBOX_SIZE = 100
-    _VIEWBOX_CENTER = _VIEWBOX_SIZE / 2
-    _RADIUS_PADDING = 1
+    # Emitted when the overlay can be seen again after being closed,
+    # minimized or covered, so the caller can catch up in one update.
+    resumed = pyqtSignal()
 
-    def __init__(self, parent: QWidget | None = None) -> None:
+    def __init__(
+        self,
+        parent: QWidget | None = None,
+        *,
+        host: QWidget | None = None,
+        backend: RendererBackend | None = None,
+    ) -> None:
         super().__init__(parent)
         self.setWindowTitle("Progress circle")
         self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
@@ -22,83 +66,233 @@ class ProgressOverlay(QDialog):
             Qt.WindowType.FramelessWindowHint | Qt.WindowType.WindowTransparentForInput
         )
 
-        layout = QVBoxLayout()
-        layout.setContentsMargins(0, 0, 0, 0)
-
-        self._web = QWebEngineView()
-        self._web.page().setBackgroundColor(Qt.GlobalColor.transparent)
-        layout.addWidget(self._web)
-        self.setLayout(layout)
-
-        self._page_loaded = False
-        self._web.page().loadFinished.connect(self._on_page_loaded)
-        self._pending_js: list[str] = []
-
-    def _on_page_loaded(self, ok: bool) -> None:
-        self._page_loaded = True
-        for js in self._pending_js:
-            self._web.page().runJavaScript(js)
-        self._pending_js.clear()
-
-    def _run_js(self, js: str) -> None:
-        if self._page_loaded:
-            self._web.page().runJavaScript(js)
-        else:
-            self._pending_js.append(js)
-
-    def _compute_geometry(self, config: Config) -> tuple[float, float]:
-        max_stroke = max(config.main_circle_stroke_width, config.back_circle_stroke_width)
-        radius = max(1, self._VIEWBOX_CENTER - (max_stroke / 2) - self._RADIUS_PADDING)
-        return radius, 2 * math.pi * radius
-
-    def _resolve_appearance(
-        self, config: Config, percent: float, *, force_visible: bool = False
-    ) -> tuple[float, str]:
-        hidden = not force_visible and percent == 0 and config.hide_main_circle_at_zero
-        opacity = 0.0 if hidden else config.main_color_opacity / 100
-        mask = "url(#mask)" if config.mask_circles and opacity != 0 else ""
-        return opacity, mask
+        self._layout = QVBoxLayout()
+        self._layout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(self._layout)
+
+        self._renderer: OverlayRenderer | None = None
+        # Overrides the configured backend when set.
+        self._backend = backend
+        self._active = False
+        self._watched_window: QWindow | None = None
+        # The overlay has no parent, so it isn't minimized along with Anki's
+        # main window on its own; follow the host's window state instead.
+        self._host = host
+        if host is not None:
+            host.installEventFilter(self)
+
+    def _renderer_for(self, config: Config) -> OverlayRenderer:
+        backend = self._backend or RendererBackend(config.renderer_backend)
+        if self._renderer is not None and self._renderer.backend == backend:
+            return self._renderer
+        if self._renderer is not None:
+            self._renderer.stop_timer()
+            self._layout.removeWidget(self._renderer.widget)
+            self._renderer.widget.deleteLater()
+        self._renderer = create_renderer(backend)
+        self._layout.addWidget(self._renderer.widget)
+        self._renderer.set_active(self._active)
+        return self._renderer
+
+    # Visibility
+
+    def is_active(self) -> bool:
+        # Shown, not minimized (itself or via the host) and actually exposed
+        # on screen, which also rules out most locked or covered displays.
+        if not self.isVisible() or self.isMinimized():
+            return False
+        if self._host is not None and self._host.isMinimized():
+            return False
+        window = self.windowHandle()
+        return window is None or window.isExposed()
+
+    def _sync_active(self) -> None:
+        active = self.is_active()
+        if active == self._active:
+            return
+        self._active = active
+        diagnostics.count("overlay.resumed" if active else "overlay.suspended")
+        if self._renderer is not None:
+            self._renderer.set_active(active)
+        if active:
+            self.resumed.emit()
+
+    def showEvent(self, event: QShowEvent) -> None:
+        super().showEvent(event)
+        window = self.windowHandle()
+        if window is not None and window is not self._watched_window:
+            window.installEventFilter(self)
+            self._watched_window = window
+        self._sync_active()
+
+    def hideEvent(self, event: QHideEvent) -> None:
+        super().hideEvent(event)
+        self._sync_active()
+
+    def changeEvent(self, event: QEvent) -> None:
+        super().changeEvent(event)
+        if event.type() == QEvent.Type.WindowStateChange:
+            self._sync_active()
+
+    def eventFilter(self, watched: QObject, event: QEvent) -> bool:
+        if (watched is self._watched_window and event.type() == QEvent.Type.Expose) or (
+            watched is self._host and event.type() == QEvent.Type.WindowStateChange
+        ):
+            self._sync_active()
+        return False
 
+    # Placement
+
+    def show_placed(self, config: Config, screen: QScreen) -> None:
+        # Full screen keeps the original look, but the compositor then blends
+        # a screen-sized translucent surface for every frame; the compact
+        # window only covers the circle. Either way the geometry is set
+        # explicitly rather than maximizing, so each window lands on its own
+        # screen.
+        area = screen.availableGeometry()
+        if OverlayGeometry(config.overlay_geometry) == OverlayGeometry.COMPACT:
+            area = compact_geometry(area, config)
+        self.setGeometry(area)
+        self.showNormal()
+
+    # Drawing
+
+    def prewarm(self, config: Config) -> None:
+        # Builds the renderer (and, for the web backend, starts its page) so
+        # that the first real show doesn't pay for it.
+        self._renderer_for(config).render(config, 0.0)
+
+    @diagnostics.timed("overlay.render")
     def render(self, config: Config, percent: float) -> None:
-        radius, circumference = self._compute_geometry(config)
-        dash_length = circumference * (percent / 100)
-        opacity, mask = self._resolve_appearance(config, percent)
-
-        self._page_loaded = False
-        self._pending_js.clear()
-        self._web.setHtml(
-            _HTML_TEMPLATE.safe_substitute(
-                radius=radius,
-                circumference=circumference,
-                dash_length=dash_length,
-                main_color=config.main_color,
-                back_color=config.back_color,
-                main_color_opacity=opacity,
-                back_color_opacity=config.back_color_opacity / 100,
-                main_stroke_width=config.main_circle_stroke_width,
-                back_stroke_width=config.back_circle_stroke_width,
-                stroke_linecap=config.stroke_linecap,
-                mask=mask,
-            )
-        )
+        self._renderer_for(config).render(config, percent)
 
+    @diagnostics.timed("overlay.update_progress")
     def update_progress(self, config: Config, percent: float) -> None:
-        _, circumference = self._compute_geometry(config)
-        dash_length = circumference * (percent / 100)
-        opacity, mask = self._resolve_appearance(config, percent)
-        self._run_js(f"updateCircle({dash_length}, {circumference}, {opacity}, '{mask}')")
-
-    def start_timer(self, config: Config, duration_seconds: int) -> None:
-        # force_visible=True so hide_main_circle_at_zero doesn't suppress the circle.
-        opacity, mask = self._resolve_appearance(config, 0.0, force_visible=True)
-        self._run_js(
-            f"document.getElementById('progress-circle').setAttribute('stroke-opacity', {opacity})"
-        )
-        self._run_js(f"document.getElementById('back-circle').setAttribute('mask', '{mask}')")
-        self._run_js(
-            f"startTimer({duration_seconds * 1000}, "
-            f"'{config.timer_direction}', {config.timer_interval_ms})"
-        )
+        self._renderer_for(config).update_progress(config, percent)
+
+    def patch_appearance(
+        self, config: Config, percent: float, *, timer_running: bool = False
+    ) -> None:
+        self._renderer_for(config).patch_appearance(config, percent, timer_running=timer_running)
+
+    def start_timer(self, config: Config, duration_seconds: int, *, elapsed_ms: int = 0) -> None:
+        self._renderer_for(config).start_timer(config, duration_seconds, elapsed_ms=elapsed_ms)
+
+    def stop_timer(self) -> None:
+        if self._renderer is not None:
+            self._renderer.stop_timer()
+
+    def set_caption(self, text: str) -> None:
+        if self._renderer is not None:
+            self._renderer.set_caption(text)
+
+
+# Shows the overlay on several screens at once. Every call is applied to each
+# window, so the controller keeps one progress and timer state and sends each
+# update once. Only the first window uses the configured backend; the others
+# draw natively, so an extra screen costs a widget rather than another
+# Chromium page.
+class OverlayGroup(QObject):
+    resumed = pyqtSignal()
+    # New windows start blank; the owner redraws the group when this fires.
+    windows_added = pyqtSignal()
+
+    def __init__(self, *, host: QWidget | None = None) -> None:
+        super().__init__()
+        self._host = host
+        self._windows: list[ProgressOverlay] = []
+        self._screens: list[QScreen] = []
+        self._config: Config | None = None
+        app = QGuiApplication.instance()
+        app.screenAdded.connect(self._on_screens_changed)
+        app.screenRemoved.connect(self._on_screens_changed)
+
+    def _target_screens(self, config: Config) -> list[QScreen]:
+        wanted = set(config.overlay_screens)
+        screens = [screen for screen in QGuiApplication.screens() if screen.name() in wanted]
+        if screens:
+            return screens
+        host_screen = self._host.screen() if self._host is not None else None
+        return [host_screen or QGuiApplication.primaryScreen()]
+
+    def _sync_windows(self, config: Config) -> bool:
+        self._screens = self._target_screens(config)
+        added = False
+        while len(self._windows) < len(self._screens):
+            backend = RendererBackend.NATIVE if self._windows else None
+            window = ProgressOverlay(None, host=self._host, backend=backend)
+            window.resumed.connect(self.resumed)
+            self._windows.append(window)
+            added = True
+        while len(self._windows) > len(self._screens):
+            window = self._windows.pop()
+            window.stop_timer()
+            window.close()
+            window.deleteLater()
+        return added
+
+    def _on_screens_changed(self) -> None:
+        # A removed screen is still listed while its signal is delivered.
+        QTimer.singleShot(0, self._place_again)
+
+    def _place_again(self) -> None:
+        if self._config is not None and self.isVisible():
+            self.show_placed(self._config)
+
+    # Visibility
+
+    def isVisible(self) -> bool:
+        return any(window.isVisible() for window in self._windows)
+
+    def is_active(self) -> bool:
+        return any(window.is_active() for window in self._windows)
+
+    def show_placed(self, config: Config) -> None:
+        self._config = config
+        if self._sync_windows(config):
+            self.windows_added.emit()
+        for window, screen in zip(self._windows, self._screens, strict=True):
+            window.show_placed(config, screen)
+
+    def close(self) -> None:
+        for window in self._windows:
+            window.close()
+
+    def deleteLater(self) -> None:
+        for window in self._windows:
+            window.deleteLater()
+        self._windows.clear()
+        super().deleteLater()
+
+    # Drawing
+
+    def prewarm(self, config: Config) -> None:
+        self._sync_windows(config)
+        for window in self._windows:
+            window.prewarm(config)
+
+    def render(self, config: Config, percent: float) -> None:
+        for window in self._windows:
+            window.render(config, percent)
+
+    def update_progress(self, config: Config, percent: float) -> None:
+        for window in self._windows:
+            window.update_progress(config, percent)
+
+    def patch_appearance(
+        self, config: Config, percent: float, *, timer_running: bool = False
+    ) -> None:
+        for window in self._windows:
+            window.patch_appearance(config, percent, timer_running=timer_running)
+
+    def start_timer(self, config: Config, duration_seconds: int, *, elapsed_ms: int = 0) -> None:
+        for window in self._windows:
+            window.start_timer(config, duration_seconds, elapsed_ms=elapsed_ms)
 
     def stop_timer(self) -> None:
-        self._run_js("stopTimer()")
+        for window in self._windows:
+            window.stop_timer()
+
+    def set_caption(self, text: str) -> None:
+        for window in self._windows:
+            window.set_caption(text)
@@ -0,0 +1,118 @@
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import NamedTuple
+
+
+class DeckProgress(NamedTuple):
+    done: int
+    total: int
+    percent: float
+
+
+@dataclass
+class _DeckCounter:
+    goal: int
+    remaining: int
+    # Cards finished today according to the revlog; when known, progress is
+    # studied / (studied + remaining) rather than measured against `goal`.
+    studied: int | None = None
+
+
+# Keeps per-deck progress up to date from answer/undo/operation events. The
+# scheduler is only consulted through `reconcile`, when the incremental counts
+# can no longer be trusted or the periodic reconcile is due.
+class ProgressEngine:
+    def __init__(self) -> None:
+        self._decks: dict[int, _DeckCounter] = {}
+        self._dirty = True
+        self._answers_since_reconcile = 0
+
+    def needs_reconcile(self, reconcile_every: int) -> bool:
+        # A reconcile counts every deck, so a deck still missing afterwards
+        # has nothing due; only drift or the periodic check warrant another.
+        if self._dirty:
+            return True
+        return reconcile_every > 0 and self._answers_since_reconcile >= reconcile_every
+
+    def reconcile(
+        self,
+        remaining_by_deck: dict[int, int],
+        studied_by_deck: dict[int, int] | None = None,
+        baseline: Callable[[int], tuple[int, int] | None] | None = None,
+    ) -> list[int]:
+        # Counts cover every deck at once, each including its subdecks. A deck
+        # seen for the first time starts from `baseline` (an earlier session's
+        # goal and remaining) when it has one. Returns the decks whose counts
+        # moved, for the caller to persist.
+        changed = []
+        for deck_id, remaining in remaining_by_deck.items():
+            counter = self._decks.get(deck_id)
+            if counter is None and baseline is not None:
+                saved = baseline(deck_id)
+                if saved is not None:
+                    counter = self._decks[deck_id] = _DeckCounter(*saved)
+            if counter is None:
+                counter = self._decks[deck_id] = _DeckCounter(goal=remaining, remaining=remaining)
+            elif remaining > counter.goal:
+                # New cards were added mid-session; reset the baseline.
+                counter.goal = counter.remaining = remaining
+                changed.append(deck_id)
+            elif remaining != counter.remaining:
+                counter.remaining = remaining
+                changed.append(deck_id)
+            counter.studied = None if studied_by_deck is None else studied_by_deck.get(deck_id, 0)
+        self._dirty = False
+        self._answers_since_reconcile = 0
+        return changed
+
+    def has_deck(self, deck_id: int) -> bool:
+        return deck_id in self._decks
+
+    def counter(self, deck_id: int) -> tuple[int, int] | None:
+        counter = self._decks.get(deck_id)
+        return None if counter is None else (counter.goal, counter.remaining)
+
+    def seed(self, deck_id: int, goal: int, remaining: int) -> None:
+        # Restores a baseline from an earlier session; the next reconcile
+        # still checks it against the real queue.
+        self._decks[deck_id] = _DeckCounter(goal=goal, remaining=remaining)
+        self._dirty = True
+
+    def record_answer(self, lineage: tuple[int, ...], *, still_queued: bool) -> list[int]:
+        # `lineage` is the card's deck followed by its ancestors, all of which
+        # count the card in their totals. Returns the decks whose counts moved.
+        self._answers_since_reconcile += 1
+        if still_queued:
+            return []
+        changed = []
+        for deck_id in lineage:
+            counter = self._decks.get(deck_id)
+            if counter is None or counter.remaining <= 0:
+                # The card came from outside what we counted; our numbers drifted.
+                self._dirty = True
+                continue
+            counter.remaining -= 1
+            if counter.studied is not None:
+                counter.studied += 1
+            changed.append(deck_id)
+        return changed
+
+    def invalidate(self) -> None:
+        self._dirty = True
+
+    def clear(self) -> None:
+        self._decks.clear()
+        self._dirty = True
+
+    def progress(self, deck_id: int) -> DeckProgress:
+        counter = self._decks.get(deck_id)
+        if counter is None:
+            return DeckProgress(0, 0, 0.0)
+        if counter.studied is not None:
+            done = counter.studied
+            total = done + counter.remaining
+        else:
+            total = counter.goal
+            done = total - counter.remaining
+        percent = (done / total * 100) if total > 0 else 0.0
+        return DeckProgress(done, total, percent)
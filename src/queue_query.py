@@ -0,0 +1,88 @@
+from collections.abc import Callable
+from typing import NamedTuple
+
+from anki.collection import Collection
+from aqt import mw
+from aqt.operations import QueryOp
+
+from .revlog import studied_today_by_deck
+
+
+class QueueCounts(NamedTuple):
+    # Cards left today per deck, children included (as the deck list shows).
+    remaining: dict[int, int]
+    # Cards finished today per deck, children not included.
+    studied: dict[int, int] | None = None
+
+
+def count_queue(col: Collection) -> QueueCounts:
+    # One due-tree call counts every deck, so switching decks needs no query.
+    remaining: dict[int, int] = {}
+    nodes = list(col.sched.deck_due_tree().children)
+    while nodes:
+        node = nodes.pop()
+        remaining[node.deck_id] = node.new_count + node.learn_count + node.review_count
+        nodes.extend(node.children)
+    return QueueCounts(remaining)
+
+
+def count_queue_and_revlog(col: Collection) -> QueueCounts:
+    return count_queue(col)._replace(studied=studied_today_by_deck(col))
+
+
+# Runs a queue count on Anki's background task pool with at most one query in
+# flight. Requests arriving while a query runs collapse into a single trailing
+# refresh, and only the freshest result is delivered.
+class QueueCountQuery:
+    def __init__(
+        self,
+        on_result: Callable[[QueueCounts], None],
+        op: Callable[[Collection], QueueCounts] = count_queue,
+    ) -> None:
+        self._on_result = on_result
+        self._op = op
+        self._in_flight = False
+        self._pending = False
+        # Bumped by cancel(); results from an older generation are dropped.
+        self._generation = 0
+
+    @property
+    def in_flight(self) -> bool:
+        return self._in_flight
+
+    def request(self) -> None:
+        if self._in_flight:
+            self._pending = True
+            return
+        if not mw.col:
+            return
+        self._in_flight = True
+        generation = self._generation
+        QueryOp(
+            parent=mw, op=self._op, success=lambda counts: self._on_success(generation, counts)
+        ).failure(lambda exc: self._on_failure(generation, exc)).run_in_background()
+
+    def cancel(self) -> None:
+        # Forgets the query in flight (say, the collection is closing); its
+        # result is discarded when it arrives.
+        self._generation += 1
+        self._in_flight = False
+        self._pending = False
+
+    def _on_success(self, generation: int, counts: QueueCounts) -> None:
+        if generation != self._generation:
+            return
+        self._in_flight = False
+        if self._pending:
+            # The queue changed while we were counting; this result is stale.
+            self._pending = False
+            self.request()
+            return
+        self._on_result(counts)
+
+    def _on_failure(self, generation: int, exc: Exception) -> None:
+        # Typically the collection closed mid-query; the next request retries.
+        if generation != self._generation:
+            return
+        self._in_flight = False
+        self._pending = False
@@ -0,0 +1,59 @@
+import math
+from typing import Protocol
+
+from aqt.qt import QWidget
+
+from .config import Config, RendererBackend
+
+VIEWBOX_SIZE = 100
+VIEWBOX_CENTER = VIEWBOX_SIZE / 2
+RADIUS_PADDING = 1
+
+
+def compute_geometry(config: Config) -> tuple[float, float]:
+    max_stroke = max(config.main_circle_stroke_width, config.back_circle_stroke_width)
+    radius = max(1, VIEWBOX_CENTER - (max_stroke / 2) - RADIUS_PADDING)
+    return radius, 2 * math.pi * radius
+
+
+def resolve_appearance(
+    config: Config, percent: float, *, force_visible: bool = False
+) -> tuple[float, bool]:
+    hidden = not force_visible and percent == 0 and config.hide_main_circle_at_zero
+    opacity = 0.0 if hidden else config.main_color_opacity / 100
+    masked = config.mask_circles and opacity != 0
+    return opacity, masked
+
+
+class OverlayRenderer(Protocol):
+    backend: RendererBackend
+    widget: QWidget
+
+    def render(self, config: Config, percent: float) -> None: ...
+
+    def update_progress(self, config: Config, percent: float) -> None: ...
+
+    def patch_appearance(
+        self, config: Config, percent: float, *, timer_running: bool = False
+    ) -> None: ...
+
+    def start_timer(
+        self, config: Config, duration_seconds: int, *, elapsed_ms: int = 0
+    ) -> None: ...
+
+    def stop_timer(self) -> None: ...
+
+    def set_active(self, active: bool) -> None: ...
+
+    def set_caption(self, text: str) -> None: ...
+
+
+def create_renderer(backend: RendererBackend) -> OverlayRenderer:
+    # Imported lazily so the unused backend (and QtWebEngine) is never loaded.
+    if backend == RendererBackend.NATIVE:
+        from .native_renderer import NativeRenderer
+
+        return NativeRenderer()
+    from .web_renderer import WebRenderer
+
+    return WebRenderer()
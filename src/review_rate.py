@@ -0,0 +1,99 @@
+import math
+from array import array
+
+# Recent answer times kept for the windowed rate; the buffer never grows.
+_CAPACITY = 256
+# Weight of the newest interval in the moving average (about the last dozen
+# answers dominate).
+_ALPHA = 0.15
+# Longer gaps are breaks rather than slow answers and don't count towards the
+# pace.
+_BREAK_SECONDS = 300.0
+# Below this many answers the estimate is too noisy to show.
+_MIN_ANSWERS = 3
+
+
+def _active(interval: float) -> float:
+    return interval if 0 < interval <= _BREAK_SECONDS else 0.0
+
+
+# Study pace from answer timestamps. Times live in a preallocated array used as
+# a ring; the pace is an exponentially weighted average of the intervals
+# between answers, and the throughput over the ring is kept as running sums
+# that are adjusted as answers enter and leave it. Recording an answer and
+# reading either figure are O(1), and memory stays the same however long the
+# session runs.
+class ReviewRate:
+    def __init__(self, capacity: int = _CAPACITY) -> None:
+        self._times = array("d", bytes(8 * capacity))
+        self._capacity = capacity
+        self.clear()
+
+    def clear(self) -> None:
+        self._head = 0
+        self._count = 0
+        self._answers = 0
+        self._mean_interval = 0.0
+        self._window_seconds = 0.0
+        self._window_intervals = 0
+
+    def _last(self) -> float:
+        return self._times[(self._head - 1) % self._capacity]
+
+    def record(self, now: float) -> None:
+        if self._count == self._capacity:
+            # The oldest answer is about to be overwritten, and with it the
+            # interval to the one after it.
+            evicted = _active(
+                self._times[(self._head + 1) % self._capacity] - self._times[self._head]
+            )
+            if evicted:
+                self._window_seconds = max(0.0, self._window_seconds - evicted)
+                self._window_intervals -= 1
+        if self._count:
+            interval = _active(now - self._last())
+            if interval:
+                self._window_seconds += interval
+                self._window_intervals += 1
+                if self._answers:
+                    self._mean_interval += _ALPHA * (interval - self._mean_interval)
+                else:
+                    self._mean_interval = interval
+                self._answers += 1
+        self._times[self._head] = now
+        self._head = (self._head + 1) % self._capacity
+        self._count = min(self._count + 1, self._capacity)
+
+    def cards_per_minute(self) -> float | None:
+        # Current pace, leaning on the most recent answers.
+        if self._answers < _MIN_ANSWERS or self._mean_interval <= 0:
+            return None
+        return 60.0 / self._mean_interval
+
+    def throughput(self) -> float | None:
+        # Cards per minute over the answers still in the ring, breaks left out.
+        if self._window_intervals < _MIN_ANSWERS or self._window_seconds <= 0:
+            return None
+        return 60.0 * self._window_intervals / self._window_seconds
+
+    def seconds_left(self, remaining: int) -> float | None:
+        if self.cards_per_minute() is None:
+            return None
+        return max(0, remaining) * self._mean_interval
+
+
+def format_eta(rate: ReviewRate, remaining: int) -> str:
+    if remaining <= 0:
+        return ""
+    seconds = rate.seconds_left(remaining)
+    if seconds is None:
+        return ""
+    minutes = max(1, math.ceil(seconds / 60))
+    if minutes < 60:
+        left = f"{minutes} min"
+    else:
+        left = f"{minutes // 60} h {minutes % 60:02d} min"
+    throughput = rate.throughput()
+    if throughput is None:
+        return f"≈ {left} left"
+    return f"≈ {left} left · {throughput:.1f} cards/min"
@@ -0,0 +1,78 @@
+from collections.abc import Callable
+from typing import Any
+
+from aqt import mw
+from aqt.webview import WebContent
+
+from .bridge import Channel
+from .config import Config
+from .web_renderer import BridgedCircle, circle_css, circle_markup, circle_script
+
+# Lays the circle over the card the way the overlay window does, without
+# taking clicks.
+_EMBED_CSS = """
+#progress-circle-embed {
+  position: fixed;
+  inset: 0;
+  display: flex;
+  justify-content: center;
+  align-items: center;
+  pointer-events: none;
+  z-index: 1000;
+}
+"""
+
+
+def _eval_in_reviewer(script: str, callback: Callable[[Any], None] | None = None) -> None:
+    # AnkiWebView holds scripts back until its page has loaded.
+    if callback is None:
+        mw.reviewer.web.eval(script)
+    else:
+        mw.reviewer.web.evalWithCallback(script, callback)
+
+
+# The circle drawn inside the reviewer's own webview: injected when the
+# reviewer page is built and updated through eval(), so studying needs no
+# second page, window or full-screen compositing.
+class ReviewerCircle(BridgedCircle):
+    def __init__(self) -> None:
+        super().__init__(_eval_in_reviewer)
+        self._attached = False
+        self._shown = False
+
+    @property
+    def attached(self) -> bool:
+        return self._attached
+
+    def is_active(self) -> bool:
+        return self._attached and self._shown
+
+    def attach(
+        self, web_content: WebContent, config: Config, percent: float, *, shown: bool
+    ) -> None:
+        web_content.head += f"<style>{circle_css()}{_EMBED_CSS}</style>"
+        web_content.body += (
+            '<div id="progress-circle-embed">'
+            f"{circle_markup(config, percent, hidden=not shown)}</div>"
+            f"<script>{circle_script(config)}</script>"
+        )
+        self._bridge.reset()
+        self._bridge.set_ready()
+        self._attached = True
+        self._shown = shown
+
+    def detach(self) -> None:
+        # Review has ended, or the reviewer page is being rebuilt without the
+        # circle.
+        self._bridge.reset()
+        self._attached = False
+        self._shown = False
+
+    def set_shown(self, shown: bool) -> None:
+        self._shown = shown
+        self._bridge.post(Channel.LIFECYCLE, hidden=not shown, suspended=not shown)
+
+    def render(self, config: Config, percent: float) -> None:
+        # The page already exists, so a full redraw is a full patch.
+        self.stop_timer()
+        self.patch_appearance(config, percent)
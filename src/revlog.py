@@ -0,0 +1,21 @@
+from anki.collection import Collection
+from anki.consts import QUEUE_TYPE_LRN, REVLOG_RESCHED
+
+_SECONDS_PER_DAY = 86_400
+
+
+def studied_today_by_deck(col: Collection) -> dict[int, int]:
+    # Cards answered since the start of the scheduler day and not waiting in
+    # intraday learning, per deck (children not included). Revlog ids are
+    # millisecond timestamps, so the day bound is a primary-key range scan.
+    day_start_ms = (col.sched.day_cutoff - _SECONDS_PER_DAY) * 1000
+    rows = col.db.all(
+        f"""
+        select c.did, count(distinct r.cid) from revlog r join cards c on c.id = r.cid
+        where r.id > ? and r.type < {REVLOG_RESCHED} and r.ease > 0
+        and c.queue != {QUEUE_TYPE_LRN}
+        group by c.did
+        """,
+        day_start_ms,
+    )
+    return {deck_id: count for deck_id, count in rows}
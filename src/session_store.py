@@ -0,0 +1,112 @@
+import json
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import NamedTuple
+
+from aqt.qt import QTimer
+
+_MAX_ENTRIES = 256
+_FLUSH_DELAY_MS = 30_000
+
+
+class SessionEntry(NamedTuple):
+    goal: int
+    remaining: int
+    # Epoch seconds at which the scheduler day this entry belongs to ends.
+    day_cutoff: int
+
+
+# Per-deck progress baselines keyed by (profile, deck id, scheduler day),
+# persisted to a small JSON file so a restart mid-day resumes where the
+# session left off. Entries expire at their day cutoff, the least recently
+# used ones are dropped past _MAX_ENTRIES, and writes are batched.
+class SessionStore:
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._entries: OrderedDict[str, SessionEntry] | None = None
+        self._dirty = False
+        self._flush_timer: QTimer | None = None
+
+    @staticmethod
+    def _key(profile: str, deck_id: int, day: int) -> str:
+        return f"{profile}/{deck_id}/{day}"
+
+    def _load(self) -> OrderedDict[str, SessionEntry]:
+        if self._entries is None:
+            self._entries = OrderedDict()
+            try:
+                raw = json.loads(self._path.read_text())
+            except (OSError, ValueError):
+                raw = {}
+            for key, value in raw.items():
+                try:
+                    self._entries[key] = SessionEntry(*value)
+                except TypeError:
+                    continue
+            self._evict()
+        return self._entries
+
+    def _evict(self) -> None:
+        entries = self._entries
+        if entries is None:
+            return
+        now = time.time()
+        for key in [k for k, entry in entries.items() if entry.day_cutoff <= now]:
+            del entries[key]
+            self._dirty = True
+        while len(entries) > _MAX_ENTRIES:
+            entries.popitem(last=False)
+            self._dirty = True
+
+    def get(self, profile: str, deck_id: int, day: int) -> SessionEntry | None:
+        entries = self._load()
+        key = self._key(profile, deck_id, day)
+        entry = entries.get(key)
+        if entry is None or entry.day_cutoff <= time.time():
+            return None
+        entries.move_to_end(key)
+        return entry
+
+    def put(self, profile: str, deck_id: int, day: int, entry: SessionEntry) -> None:
+        entries = self._load()
+        key = self._key(profile, deck_id, day)
+        if entries.get(key) == entry:
+            return
+        entries[key] = entry
+        entries.move_to_end(key)
+        if len(entries) > _MAX_ENTRIES:
+            entries.popitem(last=False)
+        self._dirty = True
+        self._schedule_flush()
+
+    def expire(self) -> None:
+        if self._entries is not None:
+            self._evict()
+            if self._dirty:
+                self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        if self._flush_timer is None:
+            self._flush_timer = QTimer()
+            self._flush_timer.setSingleShot(True)
+            self._flush_timer.timeout.connect(self.flush)
+        if not self._flush_timer.isActive():
+            self._flush_timer.start(_FLUSH_DELAY_MS)
+
+    def flush(self) -> None:
+        if self._flush_timer is not None:
+            self._flush_timer.stop()
+        if not self._dirty or self._entries is None:
+            return
+        self._dirty = False
+        data = {key: list(entry) for key, entry in self._entries.items()}
+        try:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self._path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(data, separators=(",", ":")))
+            os.replace(tmp, self._path)
+        except OSError:
+            # Losing a baseline only costs accuracy after a restart; retry later.
+            self._dirty = True
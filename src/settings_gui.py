@@ -1,6 +1,8 @@
 from collections.abc import Callable
+from dataclasses import replace
 
-from aqt import mw
+from anki.collection import OpChanges
+from aqt import gui_hooks, mw
 from aqt.qt import (
     QButtonGroup,
     QCheckBox,
@@ -11,20 +13,36 @@ from aqt.qt import (
     QDialogButtonBox,
     QFormLayout,
     QGroupBox,
+    QGuiApplication,
     QHBoxLayout,
     QLabel,
     QPushButton,
     QRadioButton,
     QSpinBox,
     Qt,
+    QTimer,
     QVBoxLayout,
     QWidget,
+    pyqtSignal,
 )
 
-from .config import Config, StrokeLinecap, TimerDirection, UpdateMode
+from .config import (
+    Config,
+    OverlayAnchor,
+    OverlayGeometry,
+    RendererBackend,
+    StrokeLinecap,
+    TimerDirection,
+    TimerMode,
+    UpdateMode,
+    with_appearance,
+)
+from .queue_query import QueueCountQuery, QueueCounts
 
 
 class ColorPickerRow(QWidget):
+    changed = pyqtSignal()
+
     def __init__(self, parent: QWidget | None = None) -> None:
         super().__init__(parent)
         self._color = QColor("#000000")
@@ -70,6 +88,7 @@ class ColorPickerRow(QWidget):
             "}"
         )
         self._hex_label.setText(color_name)
+        self.changed.emit()
 
     def _pick_color(self) -> None:
         color = QColorDialog.getColor(self._color, self, "Pick color")
@@ -93,6 +112,12 @@ class ColorPickerRow(QWidget):
         self._opacity_spin.setValue(opacity)
 
 
+# Previews follow spinbox changes once typing or key repeat settles.
+_PREVIEW_DEBOUNCE_MS = 120
+# At most one live appearance patch per display frame.
+_LIVE_PREVIEW_MS = 16
+
+
 class SettingsDialog(QDialog):
     _STROKE_LINECAP_OPTIONS = [
         ("Flat ends", StrokeLinecap.BUTT),
@@ -102,26 +127,103 @@ class SettingsDialog(QDialog):
         ("Countdown", TimerDirection.COUNTDOWN),
         ("Count up", TimerDirection.COUNTUP),
     ]
+    _TIMER_MODE_OPTIONS = [("Smooth", TimerMode.ANIMATED), ("Stepped", TimerMode.INTERVAL)]
+    _RENDERER_BACKEND_OPTIONS = [
+        ("Web page", RendererBackend.WEB),
+        ("Native (lighter)", RendererBackend.NATIVE),
+    ]
+    _OVERLAY_GEOMETRY_OPTIONS = [
+        ("Full screen", OverlayGeometry.FULLSCREEN),
+        ("Around the circle (lighter)", OverlayGeometry.COMPACT),
+    ]
+    _OVERLAY_ANCHOR_OPTIONS = [
+        ("Center", OverlayAnchor.CENTER),
+        ("Top left", OverlayAnchor.TOP_LEFT),
+        ("Top right", OverlayAnchor.TOP_RIGHT),
+        ("Bottom left", OverlayAnchor.BOTTOM_LEFT),
+        ("Bottom right", OverlayAnchor.BOTTOM_RIGHT),
+    ]
 
     def __init__(
         self,
         config: Config,
         defaults: Config | None,
         on_save: Callable[[Config], None],
+        on_preview: Callable[[Config], None] | None = None,
         parent: QWidget | None = None,
     ) -> None:
         super().__init__(parent)
         self.setWindowTitle("Circle settings")
+        # Keeps options without a widget intact when building the saved config.
+        self._config = config
         self._defaults = defaults
         self._on_save = on_save
+        self._on_preview = on_preview
+        self._previewed = False
+        # The queue total is counted once in the background and reused by every
+        # preview; it is only recounted if the collection changes meanwhile.
+        self._queue_total: int | None = None
+        self._queue_query = QueueCountQuery(self._on_queue_counted)
+        self._preview_timer = QTimer(self)
+        self._preview_timer.setSingleShot(True)
+        self._preview_timer.setInterval(_PREVIEW_DEBOUNCE_MS)
+        self._preview_timer.timeout.connect(self._render_update_preview)
         self._build_ui()
         self._apply_config_to_widgets(config)
 
+        self._queue_query.request()
+        gui_hooks.operation_did_execute.append(self._on_operation_executed)
+        self.finished.connect(self._on_finished)
+
+        if on_preview is not None:
+            self._live_preview_timer = QTimer(self)
+            self._live_preview_timer.setSingleShot(True)
+            self._live_preview_timer.setInterval(_LIVE_PREVIEW_MS)
+            self._live_preview_timer.timeout.connect(self._send_live_preview)
+            self._connect_live_preview()
+
+    def _connect_live_preview(self) -> None:
+        # Connected after the initial values are in, so opening the dialog
+        # doesn't touch the overlay.
+        for picker in (self._main_color_picker, self._back_color_picker):
+            picker.changed.connect(self._schedule_live_preview)
+        for spin in (self._main_stroke_spin, self._back_stroke_spin):
+            spin.valueChanged.connect(self._schedule_live_preview)
+        self._linecap_combo.currentIndexChanged.connect(self._schedule_live_preview)
+        for check in (self._mask_check, self._hide_at_zero_check, self._eta_check):
+            check.toggled.connect(self._schedule_live_preview)
+
+    def _schedule_live_preview(self) -> None:
+        # Throttled rather than debounced: dragging a value keeps updating.
+        if not self._live_preview_timer.isActive():
+            self._live_preview_timer.start()
+
+    def _send_live_preview(self) -> None:
+        self._previewed = True
+        self._on_preview(with_appearance(self._config, self._build_config_from_widgets()))
+
+    def _on_operation_executed(self, changes: OpChanges, handler: object | None) -> None:
+        if changes.study_queues:
+            self._queue_query.request()
+
+    def _on_finished(self) -> None:
+        gui_hooks.operation_did_execute.remove(self._on_operation_executed)
+
+    def reject(self) -> None:
+        if self._previewed:
+            # Put the overlay back the way it looked before the dialog opened.
+            self._live_preview_timer.stop()
+            self._on_preview(self._config)
+        super().reject()
+
     def _apply_config_to_widgets(self, config: Config) -> None:
         self._main_color_picker.set_color(config.main_color)
         self._main_color_picker.set_opacity(config.main_color_opacity)
         self._back_color_picker.set_color(config.back_color)
         self._back_color_picker.set_opacity(config.back_color_opacity)
+        renderer_idx = self._renderer_combo.findData(config.renderer_backend)
+        if renderer_idx >= 0:
+            self._renderer_combo.setCurrentIndex(renderer_idx)
 
         self._main_stroke_spin.setValue(config.main_circle_stroke_width)
         self._back_stroke_spin.setValue(config.back_circle_stroke_width)
@@ -131,15 +233,20 @@ class SettingsDialog(QDialog):
 
         self._mask_check.setChecked(config.mask_circles)
         self._hide_at_zero_check.setChecked(config.hide_main_circle_at_zero)
+        self._eta_check.setChecked(config.show_eta)
         self._open_startup_check.setChecked(config.open_on_startup)
+        self._embed_check.setChecked(config.embed_in_reviewer)
         self._force_decrease_check.setChecked(config.force_update_on_decrease)
 
         if config.update_every_mode == UpdateMode.PERCENT:
             self._refresh_percent_radio.setChecked(True)
+        elif config.update_every_mode == UpdateMode.TIME:
+            self._refresh_time_radio.setChecked(True)
         else:
             self._refresh_cards_radio.setChecked(True)
         self._update_n_reviews_spin.setValue(config.update_every_n_reviews)
         self._update_percent_spin.setValue(config.update_every_percent_total)
+        self._update_ms_spin.setValue(config.update_every_ms)
         self._sync_refresh_mode_ui()
 
         self._timer_duration_spin.setValue(config.timer_duration_minutes)
@@ -147,27 +254,64 @@ class SettingsDialog(QDialog):
         if direction_idx >= 0:
             self._timer_direction_combo.setCurrentIndex(direction_idx)
         self._timer_interval_spin.setValue(config.timer_interval_ms)
+        mode_idx = self._timer_mode_combo.findData(config.timer_mode)
+        if mode_idx >= 0:
+            self._timer_mode_combo.setCurrentIndex(mode_idx)
+        self._sync_timer_mode_ui()
+
+        geometry_idx = self._geometry_combo.findData(config.overlay_geometry)
+        if geometry_idx >= 0:
+            self._geometry_combo.setCurrentIndex(geometry_idx)
+        anchor_idx = self._anchor_combo.findData(config.overlay_anchor)
+        if anchor_idx >= 0:
+            self._anchor_combo.setCurrentIndex(anchor_idx)
+        self._overlay_size_spin.setValue(config.overlay_size_px)
+        self._overlay_margin_spin.setValue(config.overlay_margin_px)
+        for name, check in self._screen_checks.items():
+            check.setChecked(name in config.overlay_screens)
+        self._sync_geometry_ui()
 
     def _build_config_from_widgets(self) -> Config:
-        mode = UpdateMode.PERCENT if self._refresh_percent_radio.isChecked() else UpdateMode.CARDS
-        return Config(
+        if self._refresh_percent_radio.isChecked():
+            mode = UpdateMode.PERCENT
+        elif self._refresh_time_radio.isChecked():
+            mode = UpdateMode.TIME
+        else:
+            mode = UpdateMode.CARDS
+        screens = [name for name, check in self._screen_checks.items() if check.isChecked()]
+        # Screens that aren't connected right now keep their selection.
+        screens += [
+            name for name in self._config.overlay_screens if name not in self._screen_checks
+        ]
+        return replace(
+            self._config,
             main_color=self._main_color_picker.color,
             main_color_opacity=self._main_color_picker.opacity,
             back_color=self._back_color_picker.color,
             back_color_opacity=self._back_color_picker.opacity,
+            renderer_backend=RendererBackend(self._renderer_combo.currentData()),
             main_circle_stroke_width=self._main_stroke_spin.value(),
             back_circle_stroke_width=self._back_stroke_spin.value(),
             stroke_linecap=StrokeLinecap(self._linecap_combo.currentData()),
             mask_circles=self._mask_check.isChecked(),
             hide_main_circle_at_zero=self._hide_at_zero_check.isChecked(),
+            show_eta=self._eta_check.isChecked(),
             open_on_startup=self._open_startup_check.isChecked(),
+            embed_in_reviewer=self._embed_check.isChecked(),
+            overlay_geometry=OverlayGeometry(self._geometry_combo.currentData()),
+            overlay_anchor=OverlayAnchor(self._anchor_combo.currentData()),
+            overlay_size_px=self._overlay_size_spin.value(),
+            overlay_margin_px=self._overlay_margin_spin.value(),
+            overlay_screens=screens,
             force_update_on_decrease=self._force_decrease_check.isChecked(),
             update_every_mode=mode,
             update_every_n_reviews=self._update_n_reviews_spin.value(),
             update_every_percent_total=self._update_percent_spin.value(),
+            update_every_ms=self._update_ms_spin.value(),
             timer_duration_minutes=self._timer_duration_spin.value(),
             timer_direction=TimerDirection(self._timer_direction_combo.currentData()),
             timer_interval_ms=self._timer_interval_spin.value(),
+            timer_mode=TimerMode(self._timer_mode_combo.currentData()),
         )
 
     def _build_ui(self) -> None:
@@ -179,6 +323,7 @@ class SettingsDialog(QDialog):
 
         main_layout.addWidget(self._build_appearance_group())
         main_layout.addWidget(self._build_stroke_group())
+        main_layout.addWidget(self._build_window_group())
         main_layout.addWidget(self._build_behavior_group())
         main_layout.addWidget(self._build_timer_group())
 
@@ -209,8 +354,13 @@ class SettingsDialog(QDialog):
         self._main_color_picker = ColorPickerRow()
         self._back_color_picker = ColorPickerRow()
 
+        self._renderer_combo = QComboBox()
+        for label, value in self._RENDERER_BACKEND_OPTIONS:
+            self._renderer_combo.addItem(label, value)
+
         layout.addRow("Progress circle", self._main_color_picker)
         layout.addRow("Background circle", self._back_color_picker)
+        layout.addRow("Renderer", self._renderer_combo)
         group.setLayout(layout)
         return group
 
@@ -236,6 +386,56 @@ class SettingsDialog(QDialog):
         group.setLayout(layout)
         return group
 
+    def _build_window_group(self) -> QGroupBox:
+        group = QGroupBox("Window")
+        layout = self._aligned_form_layout()
+
+        self._geometry_combo = QComboBox()
+        for label, value in self._OVERLAY_GEOMETRY_OPTIONS:
+            self._geometry_combo.addItem(label, value)
+        self._geometry_combo.setToolTip(
+            "A window around the circle leaves the rest of the screen alone,"
+            " which is much cheaper to draw on large displays."
+        )
+        self._geometry_combo.currentIndexChanged.connect(self._sync_geometry_ui)
+
+        self._anchor_combo = QComboBox()
+        for label, value in self._OVERLAY_ANCHOR_OPTIONS:
+            self._anchor_combo.addItem(label, value)
+
+        self._overlay_size_spin = QSpinBox()
+        self._overlay_size_spin.setRange(48, 4000)
+        self._overlay_size_spin.setSingleStep(10)
+        self._overlay_size_spin.setSuffix(" px")
+
+        self._overlay_margin_spin = QSpinBox()
+        self._overlay_margin_spin.setRange(0, 1000)
+        self._overlay_margin_spin.setSuffix(" px")
+
+        screens_container = QWidget()
+        screens_layout = QVBoxLayout(screens_container)
+        screens_layout.setContentsMargins(0, 0, 0, 0)
+        self._screen_checks: dict[str, QCheckBox] = {}
+        for screen in QGuiApplication.screens():
+            size = screen.size()
+            check = QCheckBox(f"{screen.name()} ({size.width()}×{size.height()})")
+            check.setToolTip("With no screen ticked, the circle shows on the one Anki is on.")
+            self._screen_checks[screen.name()] = check
+            screens_layout.addWidget(check)
+
+        layout.addRow("Size", self._geometry_combo)
+        layout.addRow("Position", self._anchor_combo)
+        layout.addRow("Window size", self._overlay_size_spin)
+        layout.addRow("Margin from edges", self._overlay_margin_spin)
+        layout.addRow("Screens", screens_container)
+        group.setLayout(layout)
+        return group
+
+    def _sync_geometry_ui(self) -> None:
+        compact = self._geometry_combo.currentData() == OverlayGeometry.COMPACT
+        for widget in (self._anchor_combo, self._overlay_size_spin, self._overlay_margin_spin):
+            widget.setEnabled(compact)
+
     def _build_behavior_group(self) -> QGroupBox:
         group = QGroupBox("Behavior")
         layout = QVBoxLayout()
@@ -243,13 +443,20 @@ class SettingsDialog(QDialog):
 
         self._mask_check = QCheckBox("Prevent circles from blending together")
         self._hide_at_zero_check = QCheckBox("Hide the progress stroke when progress is 0%")
+        self._eta_check = QCheckBox("Show the time left and cards per minute in the circle")
         self._open_startup_check = QCheckBox("Open the progress circle on startup")
+        self._embed_check = QCheckBox("Draw the circle inside the reviewer while studying")
+        self._embed_check.setToolTip(
+            "Turning this on takes effect when the next review session starts."
+        )
 
         self._refresh_button_group = QButtonGroup(self)
         self._refresh_cards_radio = QRadioButton("Refresh every")
         self._refresh_percent_radio = QRadioButton("Refresh every")
         self._refresh_button_group.addButton(self._refresh_cards_radio)
+        self._refresh_time_radio = QRadioButton("Refresh at most every")
         self._refresh_button_group.addButton(self._refresh_percent_radio)
+        self._refresh_button_group.addButton(self._refresh_time_radio)
 
         self._update_n_reviews_spin = QSpinBox()
         self._update_n_reviews_spin.setRange(1, 100)
@@ -293,20 +500,41 @@ class SettingsDialog(QDialog):
         percent_layout.addStretch(1)
         percent_row.setLayout(percent_layout)
 
+        self._update_ms_spin = QSpinBox()
+        self._update_ms_spin.setRange(50, 10_000)
+        self._update_ms_spin.setSingleStep(50)
+        self._update_ms_spin.setSuffix(" ms")
+        self._update_ms_spin.setToolTip(
+            "Answers within this window are shown together, as soon as it ends."
+        )
+
+        time_row = QWidget()
+        time_layout = QHBoxLayout()
+        time_layout.setContentsMargins(0, 0, 0, 0)
+        time_layout.setSpacing(8)
+        time_layout.addWidget(self._refresh_time_radio)
+        time_layout.addWidget(self._update_ms_spin)
+        time_layout.addStretch(1)
+        time_row.setLayout(time_layout)
+
         update_container = QWidget()
         update_layout = QVBoxLayout()
         update_layout.setContentsMargins(0, 0, 0, 0)
         update_layout.setSpacing(6)
         update_layout.addWidget(cards_row)
         update_layout.addWidget(percent_row)
+        update_layout.addWidget(time_row)
         update_container.setLayout(update_layout)
 
         self._refresh_cards_radio.toggled.connect(self._sync_refresh_mode_ui)
         self._refresh_percent_radio.toggled.connect(self._sync_refresh_mode_ui)
+        self._refresh_time_radio.toggled.connect(self._sync_refresh_mode_ui)
 
         layout.addWidget(self._mask_check)
         layout.addWidget(self._hide_at_zero_check)
+        layout.addWidget(self._eta_check)
         layout.addWidget(self._open_startup_check)
+        layout.addWidget(self._embed_check)
         layout.addWidget(update_container)
         layout.addWidget(self._force_decrease_check)
         group.setLayout(layout)
@@ -324,6 +552,14 @@ class SettingsDialog(QDialog):
         for label, value in self._TIMER_DIRECTION_OPTIONS:
             self._timer_direction_combo.addItem(label, value)
 
+        self._timer_mode_combo = QComboBox()
+        for label, value in self._TIMER_MODE_OPTIONS:
+            self._timer_mode_combo.addItem(label, value)
+        self._timer_mode_combo.setToolTip(
+            "Smooth animates the whole countdown at once; stepped redraws it every interval."
+        )
+        self._timer_mode_combo.currentIndexChanged.connect(self._sync_timer_mode_ui)
+
         self._timer_interval_spin = QSpinBox()
         self._timer_interval_spin.setRange(5, 5000)
         self._timer_interval_spin.setSuffix(" ms")
@@ -334,31 +570,38 @@ class SettingsDialog(QDialog):
         self._timer_interval_warning.setStyleSheet("color: palette(mid);")
         self._timer_interval_warning.setWordWrap(True)
         self._timer_interval_warning.setVisible(False)
-        self._timer_interval_spin.valueChanged.connect(
-            lambda v: self._timer_interval_warning.setVisible(v < 50)
-        )
+        self._timer_interval_spin.valueChanged.connect(self._sync_timer_mode_ui)
 
         layout.addRow("Duration", self._timer_duration_spin)
         layout.addRow("Direction", self._timer_direction_combo)
+        layout.addRow("Animation", self._timer_mode_combo)
         layout.addRow("Update interval", self._timer_interval_spin)
         layout.addRow("", self._timer_interval_warning)
         group.setLayout(layout)
         return group
 
-    def _get_current_queue_total(self) -> int | None:
+    def _sync_timer_mode_ui(self) -> None:
+        stepped = self._timer_mode_combo.currentData() == TimerMode.INTERVAL
+        self._timer_interval_spin.setEnabled(stepped)
+        self._timer_interval_warning.setVisible(stepped and self._timer_interval_spin.value() < 50)
+
+    def _on_queue_counted(self, counts: QueueCounts) -> None:
         if not mw.col:
-            return None
-        queued = mw.col.sched.get_queued_cards(fetch_limit=1)
-        return int(queued.new_count + queued.learning_count + queued.review_count)
+            return
+        self._queue_total = counts.remaining.get(mw.col.decks.get_current_id())
+        self._render_update_preview()
 
     def _sync_refresh_mode_ui(self) -> None:
-        cards_mode = self._refresh_cards_radio.isChecked()
-        self._update_n_reviews_spin.setEnabled(cards_mode)
-        self._update_percent_spin.setEnabled(not cards_mode)
+        self._update_n_reviews_spin.setEnabled(self._refresh_cards_radio.isChecked())
+        self._update_percent_spin.setEnabled(self._refresh_percent_radio.isChecked())
+        self._update_ms_spin.setEnabled(self._refresh_time_radio.isChecked())
         self._refresh_update_preview()
 
     def _refresh_update_preview(self) -> None:
-        total = self._get_current_queue_total()
+        self._preview_timer.start()
+
+    def _render_update_preview(self) -> None:
+        total = self._queue_total if mw.col else None
         cards = self._update_n_reviews_spin.value()
 
         if total is None or total <= 0:
@@ -377,6 +620,8 @@ class SettingsDialog(QDialog):
             self._update_percent_preview.setText(f"≈ {n_cards} cards")
 
     def _save(self) -> None:
+        if self._on_preview is not None:
+            self._live_preview_timer.stop()
         self._on_save(self._build_config_from_widgets())
         self.accept()
 
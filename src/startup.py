@@ -0,0 +1,39 @@
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+
+# Records how long the add-on's own code runs on Anki's startup path, and
+# separately what it defers until the event loop is idle.
+class StartupTimings:
+    def __init__(self) -> None:
+        self._blocking: list[tuple[str, float]] = []
+        self._deferred: list[tuple[str, float]] = []
+
+    @contextmanager
+    def measure(self, label: str, *, deferred: bool = False) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            (self._deferred if deferred else self._blocking).append((label, elapsed_ms))
+
+    @property
+    def blocking_ms(self) -> float:
+        return sum(ms for _, ms in self._blocking)
+
+    def as_dict(self) -> dict[str, object]:
+        return {
+            "blocking_ms": round(self.blocking_ms, 2),
+            "blocking": {label: round(ms, 2) for label, ms in self._blocking},
+            "deferred": {label: round(ms, 2) for label, ms in self._deferred},
+        }
+
+    def report(self) -> str:
+        parts = [f"{label} {ms:.1f} ms" for label, ms in self._blocking]
+        parts += [f"{label} {ms:.1f} ms (idle)" for label, ms in self._deferred]
+        return f"Progress circle startup: {self.blocking_ms:.1f} ms blocking; " + ", ".join(parts)
+
+
+startup_timings = StartupTimings()
@@ -0,0 +1,121 @@
+import json
+import os
+import time
+from collections import deque
+from itertools import count
+from pathlib import Path
+from typing import Any
+
+# Oldest events are dropped past this, so a forgotten trace can't grow forever.
+_MAX_EVENTS = 200_000
+_MAIN_TID = 1
+_PAGE_TID = 2
+
+
+# Records answer-to-paint spans in Chrome's trace-event format. Each answered
+# card opens an "update" that stays open until whichever overlay update comes
+# next has been painted, so one trace shows the reviewer hook, the controller,
+# the IPC to the page and the frame that finally shows the new arc.
+class Tracer:
+    def __init__(self) -> None:
+        self.enabled = False
+        self._events: deque[dict[str, Any]] = deque(maxlen=_MAX_EVENTS)
+        self._ids = count(1)
+        self._open: set[int] = set()
+        self._current: int | None = None
+        self._pid = os.getpid()
+
+    @staticmethod
+    def _ts(ns: int) -> float:
+        return ns / 1000
+
+    def _append(self, phase: str, name: str, ts_ns: int, **fields: Any) -> None:
+        self._events.append(
+            {"ph": phase, "name": name, "ts": self._ts(ts_ns), "pid": self._pid, **fields}
+        )
+
+    def _update_event(self, phase: str, update_id: int, args: dict[str, Any]) -> None:
+        self._append(
+            phase,
+            "answer to paint",
+            time.perf_counter_ns(),
+            tid=_MAIN_TID,
+            cat="update",
+            id=update_id,
+            args=args,
+        )
+
+    def complete(self, name: str, start_ns: int, end_ns: int, **args: Any) -> None:
+        if not self.enabled:
+            return
+        if self._current is not None:
+            args["update"] = self._current
+        self._append(
+            "X", name, start_ns, tid=_MAIN_TID, dur=self._ts(end_ns - start_ns), args=args
+        )
+
+    def page_span(self, name: str, end_ns: int, duration_ms: float, update_id: int) -> None:
+        # Measured by the page's own clock; placed so that it ends when the
+        # acknowledgement reached Python.
+        if not self.enabled:
+            return
+        start_ns = end_ns - int(duration_ms * 1_000_000)
+        self._append(
+            "X", name, start_ns, tid=_PAGE_TID, dur=duration_ms * 1000, args={"update": update_id}
+        )
+
+    def start_update(self) -> None:
+        if not self.enabled:
+            return
+        if self._current is not None:
+            self.finish_update(self._current, outcome="superseded")
+        update_id = next(self._ids)
+        self._open.add(update_id)
+        self._current = update_id
+        self._update_event("b", update_id, {})
+
+    def take_update(self) -> int | None:
+        # Hands the open update to the renderer about to draw it, which
+        # finishes it once the frame is on screen.
+        update_id, self._current = self._current, None
+        return update_id
+
+    def finish_update(self, update_id: int | None, **args: Any) -> None:
+        if update_id not in self._open:
+            return
+        self._open.discard(update_id)
+        if self._current == update_id:
+            self._current = None
+        self._update_event("e", update_id, args)
+
+    def skip_update(self) -> None:
+        self.finish_update(self._current, outcome="skipped")
+
+    def clear(self) -> None:
+        self._events.clear()
+        self._open.clear()
+        self._current = None
+
+    def export(self, path: Path) -> None:
+        metadata = [
+            {"ph": "M", "name": "process_name", "pid": self._pid, "args": {"name": "Anki"}},
+            {
+                "ph": "M",
+                "name": "thread_name",
+                "pid": self._pid,
+                "tid": _MAIN_TID,
+                "args": {"name": "Main thread"},
+            },
+            {
+                "ph": "M",
+                "name": "thread_name",
+                "pid": self._pid,
+                "tid": _PAGE_TID,
+                "args": {"name": "Overlay page"},
+            },
+        ]
+        trace = {"traceEvents": metadata + list(self._events), "displayTimeUnit": "ms"}
+        path.write_text(json.dumps(trace))
+
+
+tracer = Tracer()
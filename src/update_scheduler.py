@@ -0,0 +1,36 @@
+from collections.abc import Callable
+
+from aqt.qt import QTimer
+
+
+# Leading-plus-trailing throttle for overlay updates. The first request in a
+# quiet period runs at once and opens a window of interval_ms; any number of
+# requests inside the window collapse into one more run when it closes, which
+# opens the next window. Forced requests run immediately and restart it.
+class UpdateScheduler:
+    def __init__(self, callback: Callable[[], None]) -> None:
+        self._callback = callback
+        self._pending = False
+        self._window = QTimer()
+        self._window.setSingleShot(True)
+        self._window.timeout.connect(self._on_window_closed)
+
+    def request(self, interval_ms: int, *, force: bool = False) -> None:
+        self._window.setInterval(max(1, interval_ms))
+        if self._window.isActive() and not force:
+            self._pending = True
+            return
+        self._run()
+
+    def cancel(self) -> None:
+        self._pending = False
+        self._window.stop()
+
+    def _run(self) -> None:
+        self._pending = False
+        self._window.start()
+        self._callback()
+
+    def _on_window_closed(self) -> None:
+        if self._pending:
+            self._run()
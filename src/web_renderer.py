@@ -0,0 +1,165 @@
+import time
+from functools import cache
+from pathlib import Path
+from string import Template
+
+from aqt.qt import Qt, QWebEnginePage, QWebEngineView
+
+from .bridge import Channel, JsBridge, RunJs
+from .config import Config, RendererBackend
+from .diagnostics import diagnostics
+from .renderer import compute_geometry, resolve_appearance
+from .tracing import tracer
+
+_DIR = Path(__file__).parent
+
+
+@cache
+def _template(name: str) -> Template:
+    return Template((_DIR / name).read_text())
+
+
+@cache
+def circle_css() -> str:
+    return (_DIR / "circle.css").read_text()
+
+
+def _mask_attr(masked: bool) -> str:
+    return "url(#progress-circle-mask)" if masked else ""
+
+
+def circle_markup(config: Config, percent: float, *, hidden: bool = False) -> str:
+    radius, circumference = compute_geometry(config)
+    opacity, masked = resolve_appearance(config, percent)
+    return _template("circle.html").safe_substitute(
+        radius=radius,
+        circumference=circumference,
+        dash_length=circumference * (percent / 100),
+        main_color=config.main_color,
+        back_color=config.back_color,
+        main_color_opacity=opacity,
+        back_color_opacity=config.back_color_opacity / 100,
+        main_stroke_width=config.main_circle_stroke_width,
+        back_stroke_width=config.back_circle_stroke_width,
+        stroke_linecap=config.stroke_linecap,
+        mask=_mask_attr(masked),
+        hidden="hidden" if hidden else "",
+    )
+
+
+def circle_script(config: Config) -> str:
+    _, circumference = compute_geometry(config)
+    return _template("circle.js").safe_substitute(circumference=circumference)
+
+
+# Drives a page running circle.js through a JsBridge.
+class BridgedCircle:
+    def __init__(self, run_js: RunJs) -> None:
+        self._bridge = JsBridge(run_js)
+
+    def update_progress(self, config: Config, percent: float) -> None:
+        _, circumference = compute_geometry(config)
+        dash_length = circumference * (percent / 100)
+        opacity, masked = resolve_appearance(config, percent)
+        self._bridge.post(Channel.APPEARANCE, mainOpacity=opacity, mask=_mask_attr(masked))
+        self._bridge.post(Channel.PROGRESS, dashLength=dash_length, circumference=circumference)
+        update_id = tracer.take_update()
+        if update_id is not None:
+            self._bridge.trace(update_id)
+
+    def patch_appearance(
+        self, config: Config, percent: float, *, timer_running: bool = False
+    ) -> None:
+        radius, _ = compute_geometry(config)
+        opacity, masked = resolve_appearance(config, percent, force_visible=timer_running)
+        self._bridge.post(
+            Channel.APPEARANCE,
+            mainColor=config.main_color,
+            mainOpacity=opacity,
+            mainWidth=config.main_circle_stroke_width,
+            backColor=config.back_color,
+            backOpacity=config.back_color_opacity / 100,
+            backWidth=config.back_circle_stroke_width,
+            linecap=config.stroke_linecap,
+            mask=_mask_attr(masked),
+            radius=radius,
+        )
+        if not timer_running:
+            # The radius may have changed, so the dash has to follow.
+            self.update_progress(config, percent)
+
+    def start_timer(self, config: Config, duration_seconds: int, *, elapsed_ms: int = 0) -> None:
+        # force_visible=True so hide_main_circle_at_zero doesn't suppress the circle.
+        opacity, masked = resolve_appearance(config, 0.0, force_visible=True)
+        self._bridge.post(Channel.APPEARANCE, mainOpacity=opacity, mask=_mask_attr(masked))
+        self._bridge.post(
+            Channel.TIMER,
+            action="start",
+            mode=config.timer_mode,
+            durationMs=duration_seconds * 1000,
+            direction=config.timer_direction,
+            intervalMs=config.timer_interval_ms,
+            elapsedMs=elapsed_ms,
+        )
+
+    def stop_timer(self) -> None:
+        self._bridge.post(Channel.TIMER, action="stop")
+
+    def set_caption(self, text: str) -> None:
+        self._bridge.post(Channel.CAPTION, text=text)
+
+
+class WebRenderer(BridgedCircle):
+    backend = RendererBackend.WEB
+
+    def __init__(self) -> None:
+        self.widget = self._web = QWebEngineView()
+        self._web.page().setBackgroundColor(Qt.GlobalColor.transparent)
+
+        super().__init__(self._web.page().runJavaScript)
+        self._web.page().loadFinished.connect(self._on_page_loaded)
+        self._load_started_ns: int | None = None
+        # The config the current page was built from.
+        self._page_config: Config | None = None
+
+    def _on_page_loaded(self, ok: bool) -> None:
+        if self._load_started_ns is not None:
+            diagnostics.record("web.page_load", time.perf_counter_ns() - self._load_started_ns)
+            self._load_started_ns = None
+        if not ok:
+            diagnostics.count("web.page_load_failures")
+            self._page_config = None
+        self._bridge.set_ready()
+
+    def render(self, config: Config, percent: float) -> None:
+        if config == self._page_config:
+            # The page (prewarmed, or left from an earlier show) already draws
+            # this config; bring it up to date instead of reloading Chromium.
+            self.stop_timer()
+            self.patch_appearance(config, percent)
+            return
+        self._page_config = config
+        self._bridge.reset()
+        if diagnostics.enabled:
+            self._load_started_ns = time.perf_counter_ns()
+        self._web.setHtml(
+            _template("html_circle.html").safe_substitute(
+                circle_css=circle_css(),
+                circle=circle_markup(config, percent),
+                circle_script=circle_script(config),
+            )
+        )
+
+    def set_active(self, active: bool) -> None:
+        self._bridge.post(Channel.LIFECYCLE, suspended=not active)
+        # Chromium only freezes pages that aren't shown, i.e. a closed overlay;
+        # a minimized or covered one relies on the page pausing itself.
+        page = self._web.page()
+        if active:
+            state = QWebEnginePage.LifecycleState.Active
+        elif not self._web.isVisible():
+            state = QWebEnginePage.LifecycleState.Frozen
+        else:
+            return
+        if page.lifecycleState() != state:
+            page.setLifecycleState(state)